@@ -0,0 +1,42 @@
+"""
+Few-shot example selection latency with 100k examples.
+
+    PYTHONPATH=. python benchmarks/bench_fewshot.py
+
+Run from the repository root; with the package installed (`pip install -e .`) PYTHONPATH is not needed.
+"""
+
+import random
+import time
+
+from prompete.fewshot import ExampleSelector
+
+EXAMPLES = 100_000
+QUERIES = 1000
+
+COMMON = ["the", "a", "how", "do", "i", "what", "is", "to", "my", "can"]
+VOCABULARY = [f"term{i}" for i in range(20_000)]
+
+
+def question(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(COMMON, k=3) + rng.choices(VOCABULARY, k=words))
+
+
+def main():
+    rng = random.Random(0)
+    examples = [{"question": question(rng, 10), "answer": "..." * 50} for _ in range(EXAMPLES)]
+
+    start = time.perf_counter()
+    selector = ExampleSelector(examples, text=lambda example: example["question"])
+    print(f"index build: {time.perf_counter() - start:.2f}s")
+
+    queries = [question(rng, 6) for _ in range(QUERIES)]
+    for label in ("first selection", "cached selection"):
+        start = time.perf_counter()
+        for query in queries:
+            selector.select(query, k=5, max_tokens=300)
+        print(f"{label}: {(time.perf_counter() - start) / QUERIES * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    main()
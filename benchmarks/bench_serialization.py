@@ -0,0 +1,70 @@
+"""
+Compare Chat.to_bytes/from_bytes with pickle and JSON on a 1000-turn history.
+
+    PYTHONPATH=. python benchmarks/bench_serialization.py
+
+Run from the repository root; with the package installed (`pip install -e .`) PYTHONPATH is not needed.
+"""
+
+import json
+import pickle
+import timeit
+
+from prompete import Chat
+from prompete.registry import register_tool
+
+TURNS = 1000
+REPEAT = 20
+
+
+@register_tool
+def search(query: str) -> str:
+    """Search the documents"""
+    return query
+
+
+def make_chat() -> Chat:
+    chat = Chat(model="gpt-4o-mini", system_prompt="You are a helpful research assistant. " * 50)
+    for turn in range(TURNS):
+        chat.append(f"Question {turn}: what do the documents say about topic {turn}?")
+        chat.append(
+            {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{turn}",
+                        "type": "function",
+                        "function": {"name": "search", "arguments": json.dumps({"query": f"topic {turn}"})},
+                    }
+                ],
+            }
+        )
+        chat.append(
+            {"role": "tool", "tool_call_id": f"call_{turn}", "name": "search", "content": f"Document {turn}. " * 200}
+        )
+        chat.append({"role": "assistant", "content": f"The documents say a lot about topic {turn}."})
+    chat.saved_tools = [search]
+    return chat
+
+
+def main():
+    chat = make_chat()
+    state = {"model": chat.model, "messages": chat.messages, "retries": chat.retries}
+
+    candidates = {
+        "to_bytes": (chat.to_bytes, Chat.from_bytes),
+        "to_bytes lazy": (chat.to_bytes, lambda data: Chat.from_bytes(data, lazy=True)),
+        "pickle": (lambda: pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+        "json": (lambda: json.dumps(state).encode("utf-8"), json.loads),
+    }
+    print(f"{'format':<15}{'size KB':>10}{'dump ms':>10}{'load ms':>10}")
+    for name, (dump, load) in candidates.items():
+        data = dump()
+        dump_time = timeit.timeit(dump, number=REPEAT) / REPEAT
+        load_time = timeit.timeit(lambda: load(data), number=REPEAT) / REPEAT
+        print(f"{name:<15}{len(data) / 1024:>10.0f}{dump_time * 1000:>10.2f}{load_time * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 # Prompete package
 # flake8: noqa: F401
 from prompete.chat import Chat, Prompt, SystemPrompt
+from prompete.store import ContentStore
 __version__ = "0.0.3"
@@ -0,0 +1,199 @@
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Protocol
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from prompete.chat import Chat, Prompt
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+# completion arguments that only make sense for direct calls
+LOCAL_ARGS = ("num_retries", "client", "custom_llm_provider", "api_key", "api_base", "timeout")
+
+
+class BatchBackend(Protocol):
+    def submit(self, input_path: str) -> str:
+        """Submit a batch input JSONL file and return the batch id."""
+        ...
+
+    def poll(self, batch_id: str, output_path: str) -> bool:
+        """Write the batch output JSONL to `output_path` and return True once the batch is done."""
+        ...
+
+
+class LocalBatchBackend:
+    """
+    Stand-in for a provider batch API: runs every request of the batch through `send`
+    (litellm completion by default) when the batch is submitted.
+    """
+
+    def __init__(self, send: Optional[Callable[..., Any]] = None):
+        self.send = send
+        self._outputs: dict[str, list[str]] = {}
+
+    def submit(self, input_path: str) -> str:
+        send = self.send
+        if send is None:
+            from prompete.chat import completion as send
+        lines = []
+        with open(input_path, "r", encoding="utf-8") as file:
+            for line in file:
+                request = json.loads(line)
+                output = {"id": str(uuid.uuid4()), "custom_id": request["custom_id"], "response": None, "error": None}
+                try:
+                    response = send(**request["body"])
+                    output["response"] = {"status_code": 200, "body": response.to_dict()}
+                except Exception as e:
+                    output["error"] = {"code": type(e).__name__, "message": str(e)}
+                lines.append(json.dumps(output))
+        batch_id = f"batch_{uuid.uuid4().hex}"
+        self._outputs[batch_id] = lines
+        return batch_id
+
+    def poll(self, batch_id: str, output_path: str) -> bool:
+        with open(output_path, "w", encoding="utf-8") as file:
+            file.writelines(line + "\n" for line in self._outputs.pop(batch_id))
+        return True
+
+
+class LiteLLMBatchBackend:
+    """
+    Provider batch API through litellm files and batches endpoints.
+    """
+
+    def __init__(self, custom_llm_provider: str = "openai"):
+        self.custom_llm_provider = custom_llm_provider
+
+    def submit(self, input_path: str) -> str:
+        import litellm
+
+        with open(input_path, "rb") as file:
+            input_file = litellm.create_file(
+                file=file, purpose="batch", custom_llm_provider=self.custom_llm_provider
+            )
+        batch = litellm.create_batch(
+            completion_window="24h",
+            endpoint=BATCH_ENDPOINT,
+            input_file_id=input_file.id,
+            custom_llm_provider=self.custom_llm_provider,
+        )
+        return batch.id
+
+    def poll(self, batch_id: str, output_path: str) -> bool:
+        import litellm
+
+        batch = litellm.retrieve_batch(batch_id=batch_id, custom_llm_provider=self.custom_llm_provider)
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"Batch {batch_id} {batch.status}")
+        if batch.status != "completed":
+            return False
+        content = litellm.file_content(file_id=batch.output_file_id, custom_llm_provider=self.custom_llm_provider)
+        with open(output_path, "wb") as file:
+            file.write(content.content)
+        return True
+
+
+@dataclass
+class _PendingCall:
+    chat: Chat
+    future: Future
+    response_format: Any
+    expect_tool_call: bool
+
+
+class BatchRunner:
+    """
+    Collects Chat calls into provider batch files instead of sending them one by one.
+
+    `submit` appends the message to the chat and returns a Future; `flush` writes the collected
+    requests to a JSONL file, submits it through the backend, waits for the results and completes
+    the futures with the same response_format validation and tool handling as `Chat.__call__`.
+    """
+
+    def __init__(self, backend: BatchBackend, directory: Optional[str] = None, poll_interval: float = 60.0):
+        self.backend = backend
+        self.directory = directory or tempfile.gettempdir()
+        self.poll_interval = poll_interval
+        self._requests: list[dict] = []
+        self._pending: dict[str, _PendingCall] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, chat: Chat, message: Prompt | dict | str, response_format=None, **kwargs) -> Future:
+        if any(pending.chat is chat for pending in self._pending.values()):
+            raise ValueError("Chat already has a call waiting in this batch")
+        chat.append(message)
+        kwargs = chat.response_format_kwargs(response_format, **kwargs)
+        args = chat.llm_request(**kwargs)
+        custom_id = f"request-{len(self._requests)}-{uuid.uuid4().hex[:8]}"
+        self._requests.append(
+            {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": self._body(args)}
+        )
+        future = Future()
+        self._pending[custom_id] = _PendingCall(chat, future, response_format, "tools" in args)
+        return future
+
+    @staticmethod
+    def _body(args: dict) -> dict:
+        body = {key: value for key, value in args.items() if key not in LOCAL_ARGS}
+        if isinstance(body.get("response_format"), type):
+            from litellm.utils import type_to_response_format_param
+
+            body["response_format"] = type_to_response_format_param(body["response_format"])
+        return body
+
+    def flush(self) -> list[Future]:
+        """
+        Submit the collected calls as one batch and block until all their futures are done.
+        """
+        if not self._requests:
+            return []
+        requests, pending = self._requests, self._pending
+        self._requests, self._pending = [], {}
+        futures = [call.future for call in pending.values()]
+
+        name = f"prompete-batch-{uuid.uuid4().hex}"
+        input_path = os.path.join(self.directory, f"{name}.jsonl")
+        output_path = os.path.join(self.directory, f"{name}-output.jsonl")
+        try:
+            with open(input_path, "w", encoding="utf-8") as file:
+                file.writelines(json.dumps(request, default=str) + "\n" for request in requests)
+            batch_id = self.backend.submit(input_path)
+            while not self.backend.poll(batch_id, output_path):
+                time.sleep(self.poll_interval)
+            with open(output_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        output = json.loads(line)
+                        call = pending.pop(output["custom_id"], None)
+                        if call is not None:
+                            self._complete(call, output)
+        except Exception as e:
+            for call in pending.values():
+                call.future.set_exception(e)
+            raise
+        finally:
+            for path in (input_path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        for call in pending.values():
+            call.future.set_exception(RuntimeError("No result for the request in the batch output"))
+        return futures
+
+    @staticmethod
+    def _complete(call: _PendingCall, output: dict) -> None:
+        from litellm import ModelResponse
+
+        try:
+            if output.get("error") or output["response"]["status_code"] != 200:
+                raise RuntimeError(f"Batch request failed: {output.get('error') or output['response']}")
+            response = ModelResponse(**output["response"]["body"])
+            call.chat.accept_reply(response, expect_tool_call=call.expect_tool_call)
+            call.future.set_result(call.chat.call_result(response, call.response_format))
+        except Exception as e:
+            call.future.set_exception(e)
@@ -0,0 +1,105 @@
+from typing import Any, Callable, Optional
+import hashlib
+import json
+import os
+import threading
+
+# Request arguments that do not change the response - or must not be written to disk
+IGNORED_ARGS = ("num_retries", "client", "timeout", "api_key", "metadata", "stream_options")
+
+
+class CassetteMiss(LookupError):
+    """
+    Raised in replay mode for a request that was not recorded.
+    """
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        return {"name": value.__name__, "schema": value.model_json_schema()}
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items() if item is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def request_key(args: dict) -> str:
+    """
+    Stable key of a `completion` request - requests that differ only in ignored arguments,
+    key order or None-valued message fields share the key.
+    """
+    request = {key: _normalize(value) for key, value in args.items() if key not in IGNORED_ARGS}
+    encoded = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.blake2b(encoded.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Cassette:
+    """
+    Record/replay transport for Chat: `Chat(model, transport=Cassette(path))`.
+
+    Modes:
+    - "record": send every request with `send` and append it to the cassette,
+    - "replay": answer only from the cassette, raising CassetteMiss for unknown requests,
+    - "once": replay recorded requests and record the missing ones.
+
+    The cassette file is JSON lines with a request key and a response each, indexed in memory
+    when loaded. Identical requests are answered in recorded order, repeating the last answer
+    when the recorded ones run out - so one recording can drive many identical conversations.
+    """
+
+    def __init__(self, path: str, mode: str = "replay", send: Optional[Callable[..., Any]] = None):
+        if mode not in ("record", "replay", "once"):
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.send = send
+        self._responses: dict[str, list[dict]] = {}
+        self._positions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        if mode != "record" and os.path.exists(path):
+            self._load()
+        elif mode == "record" and os.path.exists(path):
+            os.remove(path)
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._responses.setdefault(entry["key"], []).append(entry["response"])
+
+    def __len__(self) -> int:
+        return sum(len(responses) for responses in self._responses.values())
+
+    def __call__(self, **args) -> Any:
+        from litellm import ModelResponse
+
+        key = request_key(args)
+        if self.mode != "record":
+            with self._lock:
+                responses = self._responses.get(key)
+                if responses:
+                    position = self._positions.get(key, 0)
+                    self._positions[key] = position + 1
+                    return ModelResponse(**responses[min(position, len(responses) - 1)])
+            if self.mode == "replay":
+                raise CassetteMiss(f"No recorded response for request {key} to model {args.get('model')}")
+        return self._record(key, args)
+
+    def _record(self, key: str, args: dict) -> Any:
+        send = self.send
+        if send is None:
+            from prompete.chat import completion as send
+        response = send(**args)
+        data = response.to_dict()
+        with self._lock:
+            self._responses.setdefault(key, []).append(data)
+            self._positions[key] = len(self._responses[key])
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(json.dumps({"key": key, "response": data}, separators=(",", ":")) + "\n")
+        return response
@@ -1,20 +1,140 @@
-from typing import Callable, Optional, Union, Protocol, Any
+from __future__ import annotations
+
+from typing import Callable, Optional, Union, Protocol, Any, TYPE_CHECKING, get_args, get_origin
 from dataclasses import dataclass, field
-from litellm import completion, ModelResponse, Message, get_supported_openai_params
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
 from pprint import pformat
-
-from llm_easy_tools import get_tool_defs, LLMFunction
-from llm_easy_tools.processor import process_message
-from llm_easy_tools.types import ChatCompletionMessageToolCall
+import json
+import sys
+import threading
+import weakref
+
+from prompete.connections import ConnectionPool
+from prompete.latency import LatencyPolicy
+from prompete.registry import ToolSet
+from prompete.sampling import Aggregator, Samples, select
+from prompete.scheduler import Priority, RequestScheduler
+from prompete.store import ContentStore, LazyContent, history_size
 
 import logging
 
+if TYPE_CHECKING:
+    from litellm import ModelResponse, Message
+    from llm_easy_tools import LLMFunction
+    from prompete.semantic_cache import SemanticCache
+
 
 # Configure logging for this module
 logger = logging.getLogger("answerbot.chat")
 logger.setLevel(logging.DEBUG)  # Set the logger to capture DEBUG level messages
 
 
+# litellm and llm_easy_tools are slow to import - they are loaded on first use,
+# so that prompts can be built without paying for them.
+
+
+def completion(**kwargs) -> ModelResponse:
+    from litellm import completion as litellm_completion
+
+    return litellm_completion(**kwargs)
+
+
+def get_supported_openai_params(**kwargs) -> Optional[list[str]]:
+    from litellm import get_supported_openai_params as litellm_get_supported_openai_params
+
+    return litellm_get_supported_openai_params(**kwargs)
+
+
+@lru_cache(maxsize=1024)
+def supports_param(model: str, custom_llm_provider: Optional[str], param: str) -> bool:
+    """
+    Whether the model accepts the OpenAI parameter - probed once per model.
+    """
+    params = get_supported_openai_params(model=model, custom_llm_provider=custom_llm_provider)
+    return bool(params) and param in params
+
+
+def get_tool_defs(tools: list, **kwargs) -> list[dict]:
+    from llm_easy_tools import get_tool_defs as llm_easy_tools_get_tool_defs
+
+    return llm_easy_tools_get_tool_defs(tools, **kwargs)
+
+
+# weak keys, so classes defined on the fly (e.g. in tests or per request) can be collected
+_class_names: weakref.WeakKeyDictionary[type, tuple[str, ...]] = weakref.WeakKeyDictionary()
+
+
+def _public_class_names(cls: type) -> tuple[str, ...]:
+    names = _class_names.get(cls)
+    if names is None:
+        names = tuple(name for name in dir(cls) if not name.startswith("_"))
+        _class_names[cls] = names
+    return names
+
+
+def public_names(obj: object) -> list[str]:
+    """
+    Public attribute names of `obj`, as listed by dir() - the class part is computed once per class.
+    """
+    names = _public_class_names(type(obj))
+    instance_names = [
+        name
+        for name in getattr(obj, "__dict__", ())
+        if not name.startswith("_") and name not in names
+    ]
+    return [*names, *instance_names] if instance_names else list(names)
+
+
+@lru_cache(maxsize=256)
+def _response_format_tools(response_format: type) -> ToolSet:
+    tools = ToolSet([response_format])
+    tools.response_format = response_format
+    return tools
+
+
+def response_format_tools(response_format: type) -> ToolSet:
+    """
+    The tool emulating a response_format class, with its schema built once.
+    Every call returns a new ToolSet (it becomes the chat's saved_tools), the schema is shared.
+    """
+    return _response_format_tools(response_format).copy()
+
+
+def _is_list_type(annotation: Any) -> bool:
+    return get_origin(annotation) is list or any(_is_list_type(arg) for arg in get_args(annotation))
+
+
+def parse_tool_arguments(response_format: type, arguments: str):
+    """
+    Validate tool call arguments into a response_format object.
+    Arguments failing validation get the repairs LLMEasyTools applies to tool calls:
+    trailing commas are dropped and lists sent as comma separated strings (Claude does that) are split.
+    """
+    try:
+        return response_format.model_validate_json(arguments)
+    except ValueError as error:
+        from llm_easy_tools.processor import split_string_to_list
+
+        try:
+            try:
+                args = json.loads(arguments)
+            except json.JSONDecodeError:
+                args = json.loads(arguments.replace(", }", "}").replace(",}", "}"))
+            for name, field_info in response_format.model_fields.items():
+                if isinstance(args.get(name), str) and _is_list_type(field_info.annotation):
+                    args[name] = split_string_to_list(args[name])
+            return response_format.model_validate(args)
+        except Exception:
+            raise error from None
+
+
+def is_litellm_message(obj: object) -> bool:
+    # a litellm Message cannot exist before litellm is imported
+    litellm = sys.modules.get("litellm")
+    return litellm is not None and isinstance(obj, litellm.Message)
+
+
 @dataclass(frozen=True)
 class Prompt:
     def role(self) -> str:
@@ -31,6 +151,25 @@ class SystemPrompt(Prompt):
         return "system"
 
 
+class RenderedPrompt(LazyContent):
+    """
+    A Prompt returned by a tool, rendered on first use and then kept as text.
+    """
+
+    def __init__(self, prompt: Prompt, render: Callable[[Prompt], str]):
+        super().__init__()
+        self.prompt = prompt
+        self._render = render
+        self._lock = threading.Lock()
+
+    def _load(self) -> str:
+        with self._lock:
+            if self._data is None:
+                self._data = self._render(self.prompt)
+                self._render = None
+        return self._data
+
+
 class Renderer(Protocol):
     def get_template(self, name: str) -> Any: ...
 
@@ -52,27 +191,55 @@ class Chat:
     retries: int = 3
     custom_llm_provider: Optional[str] = None
     emulate_response_format: Optional[bool] = None
+    keep_response_format_result: bool = (
+        True  # if False the tool result of an emulated response_format is not added - some providers require it
+    )
+    content_store: Optional[ContentStore] = (
+        None  # shared store for interning repeated message bodies across chats
+    )
+    tool_executor: Optional[Executor] = (
+        None  # thread or process pool for tool calls, if None tools run inline
+    )
+    scheduler: Optional[RequestScheduler] = (
+        None  # limits concurrent requests per backend, shared between chats
+    )
+    priority: int = Priority.INTERACTIVE
+    connection_pool: Optional[ConnectionPool] = (
+        None  # pooled keep-alive HTTP clients, shared between chats
+    )
+    transport: Optional[Callable[..., ModelResponse]] = (
+        None  # replaces litellm completion, for example a record/replay Cassette
+    )
+    latency_policy: Optional[LatencyPolicy] = (
+        None  # deadlines, adaptive retries and hedged requests - replaces litellm retries
+    )
+    semantic_cache: Optional[SemanticCache] = (
+        None  # reuses answers to similar questions, needs numpy
+    )
 
     def __post_init__(self):
         if self.system_prompt:
             message = self.make_message(self.system_prompt)
             message["role"] = "system"
             self.append(message)
+
+    def emulates_response_format(self) -> bool:
+        """
+        Whether response_format is emulated with tools - probed from the model on first use
+        if `emulate_response_format` was not set.
+        """
         if self.emulate_response_format is None:
-            params = get_supported_openai_params(model=self.model)
-            if params and "response_format" in params:
-                self.emulate_response_format = False
-            else:
-                self.emulate_response_format = True
+            self.emulate_response_format = not supports_param(
+                self.model, self.custom_llm_provider, "response_format"
+            )
+        return self.emulate_response_format
 
     def render_prompt(self, obj: object, **kwargs) -> str:
         template_name = type(obj).__name__
         template = self.renderer.get_template(template_name)
 
         # Create a context dictionary with the object's public attributes and methods
-        obj_context = {
-            name: getattr(obj, name) for name in dir(obj) if not name.startswith("_")
-        }
+        obj_context = {name: getattr(obj, name) for name in public_names(obj)}
 
         # Merge with kwargs
         obj_context.update(kwargs)
@@ -92,7 +259,7 @@ class Chat:
             if "role" not in message or "content" not in message:
                 raise ValueError("Dict message must contain 'role' and 'content' keys")
             return message
-        elif isinstance(message, Message):
+        elif is_litellm_message(message):
             return message.model_dump()
         else:
             raise ValueError(f"Unsupported message type: {type(message)}")
@@ -102,8 +269,28 @@ class Chat:
         Append a message to the chat.
         """
         message_dict = self.make_message(message)
+        if self.content_store is not None:
+            message_dict = self.content_store.compact(message_dict)
         self.messages.append(message_dict)
 
+    def llm_messages(self) -> list[Union[dict, Message]]:
+        """
+        Return the history in the form sent to the LLM, with lazy contents materialized as strings.
+        """
+        return [
+            {**message, "content": str(message["content"])}
+            if isinstance(message, dict) and isinstance(message.get("content"), LazyContent)
+            else message
+            for message in self.messages
+        ]
+
+    def memory_usage(self) -> int:
+        """
+        Approximate number of bytes held by this chat's history,
+        not counting contents shared through the content store.
+        """
+        return history_size(self.messages, self.content_store)
+
     def __call__(
         self, message: Prompt | dict | Message | str, response_format=None, **kwargs
     ) -> str:
@@ -112,34 +299,104 @@ class Chat:
         Appends the given message and calls llm_reply with the provided kwargs.
         Returns the content of the response message as a string or as the provided response_format object.
         If the underlying LLM does not support response_format, we emulate it by using tools - but this is not perfecly reliable.
+        With a `semantic_cache` the answer to a similar earlier question can be returned without calling the LLM.
         """
         self.append(message)
+        cache_key = None
+        if self.semantic_cache is not None and not kwargs.get("tools"):
+            cache_key = self.semantic_cache.key(self.model, self.messages, response_format)
+            cached = None if cache_key is None else self.semantic_cache.get(cache_key, response_format)
+            if cached is not None:
+                content = cached if isinstance(cached, str) else cached.model_dump_json()
+                self.append({"role": "assistant", "content": content})
+                return cached
+        kwargs = self.response_format_kwargs(response_format, **kwargs)
+        response = self.llm_reply(**kwargs)
+        result = self.call_result(response, response_format)
+        if cache_key is not None:
+            self.semantic_cache.put(cache_key, result)
+        return result
 
+    def response_format_kwargs(self, response_format=None, **kwargs) -> dict:
+        """
+        Return llm_reply kwargs requesting `response_format` - natively or emulated with a tool.
+        """
         if response_format:
             if kwargs.get("tools"):
                 raise ValueError("tools and response_format cannot be used together")
-            if self.emulate_response_format:
-                kwargs["tools"] = [response_format]
+            if self.emulates_response_format():
+                kwargs["tools"] = response_format_tools(response_format)
             else:
                 kwargs["response_format"] = response_format
-        response = self.llm_reply(**kwargs)
+        return kwargs
+
+    def call_result(self, response: ModelResponse, response_format=None):
+        """
+        Return the result of a call: the content of the response message or the response_format object.
+        """
         message = response.choices[0].message
-        if response_format:
-            if self.emulate_response_format:
-                return self.process()[0]
-            else:
-                return response_format.model_validate_json(message.content)
-        else:
-            return message.content
+        if response_format and self.emulates_response_format():
+            return self.emulated_result(message, response_format)
+        return self.parse_message(message, response_format)
+
+    def emulated_result(self, message: Message, response_format):
+        """
+        Parse the forced tool call of an emulated response_format straight into the response_format object.
+        """
+        if not message.tool_calls:
+            raise ValueError("No function call.")
+        tool_call = message.tool_calls[0]
+        try:
+            result = self.parse_message(message, response_format)
+        except ValueError as e:
+            self.append_response_format_result(tool_call, str(e))
+            if self.fail_on_tool_error:
+                raise
+            return None
+        self.append_response_format_result(tool_call, f"{tool_call.function.name} created")
+        return result
+
+    def append_response_format_result(self, tool_call, content: str) -> None:
+        if self.keep_response_format_result:
+            self.append(
+                {
+                    "role": "tool",
+                    "tool_call_id": tool_call.id,
+                    "name": tool_call.function.name,
+                    "content": content,
+                }
+            )
 
     def llm_reply(self, tools=[], strict=False, **kwargs) -> ModelResponse:
+        args = self.llm_request(tools, strict, **kwargs)
+
+        logger.debug(f"llm_reply args: {pformat(args, width=120)}")
+        logger.debug(f"Sending request to LLM with {len(self.messages)} messages")
+
+        result = self._send(args)
+
+        logger.debug(
+            f"Received response from LLM: {pformat(result.to_dict(), width=120)}"
+        )
+
+        self.accept_reply(result, expect_tool_call="tools" in args)
+
+        return result
+
+    def llm_request(self, tools=[], strict=False, **kwargs) -> dict:
+        """
+        Build the arguments of the `completion` call for the next reply and save the tools for `process`.
+        """
         if strict and not tools:
             raise ValueError("Tools must be provided if strict is True")
         self.saved_tools = tools
-        schemas = get_tool_defs(tools, strict=strict)
+        if isinstance(tools, ToolSet):
+            schemas = tools.tool_defs(strict=strict)
+        else:
+            schemas = get_tool_defs(tools, strict=strict)
         args = {
             "model": self.model,
-            "messages": self.messages,
+            "messages": self.llm_messages(),
             "num_retries": self.retries,
         }
         if self.custom_llm_provider:
@@ -156,18 +413,15 @@ class Chat:
                 args["tool_choice"] = "auto"
 
         args.update(kwargs)
+        return args
 
-        logger.debug(f"llm_reply args: {pformat(args, width=120)}")
-        logger.debug(f"Sending request to LLM with {len(self.messages)} messages")
-
-        result = completion(**args)
-
-        logger.debug(
-            f"Received response from LLM: {pformat(result.to_dict(), width=120)}"
-        )
-
-        message = result.choices[0].message
+    def accept_reply(self, result: ModelResponse, expect_tool_call: bool = False) -> None:
+        """
+        Append the first choice of an LLM response to the chat.
+        """
+        self.accept_message(result.choices[0].message, expect_tool_call)
 
+    def accept_message(self, message: Message, expect_tool_call: bool = False) -> None:
         if (
             self.one_tool_per_step
             and hasattr(message, "tool_calls")
@@ -177,38 +431,147 @@ class Chat:
                 logging.warning(f"More than one tool call: {message.tool_calls}")
                 message.tool_calls = [message.tool_calls[0]]
 
-        if len(schemas) > 0:
+        if expect_tool_call:
             if not hasattr(message, "tool_calls") or not message.tool_calls:
                 logging.warning("No function call.")
 
         self.append(message)
 
-        return result
+    def sample(
+        self,
+        message: Prompt | dict | Message | str,
+        n: int,
+        response_format=None,
+        aggregate: Optional[Aggregator] = None,
+        **kwargs,
+    ) -> Samples:
+        """
+        Ask for `n` answers to the message and select one of them with `aggregate` (majority vote by default).
+        The choices are requested in one call if the provider supports `n`, otherwise with concurrent calls.
+        Every choice is validated against `response_format`; only the selected one is added to the chat.
+        """
+        self.append(message)
+        kwargs = self.response_format_kwargs(response_format, **kwargs)
+        args = self.llm_request(**kwargs)
+
+        if n > 1 and supports_param(self.model, self.custom_llm_provider, "n"):
+            messages = [choice.message for choice in self._send({**args, "n": n}).choices]
+        else:
+            with ThreadPoolExecutor(max_workers=n) as executor:
+                responses = list(executor.map(lambda _: self._send(args), range(n)))
+            messages = [response.choices[0].message for response in responses]
+
+        results = []
+        for choice in messages:
+            try:
+                results.append(self.parse_message(choice, response_format))
+            except Exception as e:
+                results.append(e)
+        selected = select(results, aggregate)
+
+        self.accept_message(messages[selected], expect_tool_call="tools" in args)
+        if response_format and self.emulates_response_format():
+            tool_call = messages[selected].tool_calls[0]
+            self.append_response_format_result(tool_call, f"{tool_call.function.name} created")
+        return Samples(results=results, messages=messages, selected=selected)
+
+    def parse_message(self, message: Message, response_format=None):
+        """
+        Return the content of a response message or the response_format object it contains.
+        """
+        if not response_format:
+            return message.content
+        if self.emulates_response_format():
+            if not message.tool_calls:
+                raise ValueError("No function call.")
+            return parse_tool_arguments(response_format, message.tool_calls[0].function.arguments)
+        return response_format.model_validate_json(message.content)
+
+    def _send(self, args: dict) -> ModelResponse:
+        if self.connection_pool is not None and "client" not in args:
+            client = self.connection_pool.client_for(args)
+            if client is not None:
+                args = {**args, "client": client}
+        send = completion if self.transport is None else self.transport
+        if self.scheduler is not None:
+            send = self._scheduled(send)
+        if self.latency_policy is not None:
+            return self.latency_policy.run(send, {**args, "num_retries": 0})
+        return send(**args)
+
+    def _scheduled(self, send: Callable[..., ModelResponse]) -> Callable[..., ModelResponse]:
+        def scheduled_send(**args) -> ModelResponse:
+            backend = (
+                args.get("api_base") or args.get("custom_llm_provider") or args["model"]
+            )
+            return self.scheduler.run(
+                backend, lambda: send(**args), priority=self.priority
+            )
+
+        return scheduled_send
 
     def process(self, **kwargs):
+        """
+        Run the tool calls of the last message, append their results and return the tool outputs.
+        Prompt outputs are returned as str-like RenderedPrompt objects, also kept in the history;
+        they are rendered once, on first use - at the latest by `llm_messages()`.
+        """
         if not self.messages:
             raise ValueError("No messages to process")
+        from litellm import Message
+        from llm_easy_tools.processor import process_message
+        from prompete.executors import run_tool_calls
+
         message = Message(**self.messages[-1])
-        results = process_message(message, self.saved_tools, **kwargs)
+        if self.tool_executor is not None:
+            results = run_tool_calls(message, self.saved_tools, self.tool_executor, **kwargs)
+        else:
+            results = process_message(message, self.saved_tools, **kwargs)
         outputs = []
         for result in results:
             if result.soft_errors:
                 for soft_error in result.soft_errors:
                     logger.warning(soft_error)
-            self.append(result.to_message())
+            output = result.output
+            if isinstance(output, Prompt):
+                if self.renderer is None:
+                    raise ValueError("Renderer is required for Prompt objects")
+                output = RenderedPrompt(output, self.render_prompt)
+                message = {
+                    "role": "tool",
+                    "tool_call_id": result.tool_call_id,
+                    "name": result.name,
+                    "content": output,
+                }
+            else:
+                message = result.to_message()
+            self.append(message)
             if result.error and self.fail_on_tool_error:
                 print(result.stack_trace)
                 raise Exception(result.error)
-            if isinstance(result.output, Prompt):
-                # TODO: This is not consistent
-                #  the messaeg saved in the chat is not rendered but converted to a string in LLMEasyTools
-                output = self.render_prompt(result.output)
-                outputs.append(output)
-            else:
-                outputs.append(result.output)
+            outputs.append(output)
 
         return outputs
 
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the chat data for handing it over to another process.
+        Tools are stored by name and must be registered with `prompete.registry.register_tool`.
+        """
+        from prompete.serialization import dump_chat
+
+        return dump_chat(self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, lazy: bool = False, **kwargs) -> Chat:
+        """
+        Rebuild a chat from `to_bytes` output. Pass the renderer and other process-local fields as kwargs.
+        With `lazy=True` large message bodies are decoded from `data` only when used.
+        """
+        from prompete.serialization import load_chat
+
+        return load_chat(cls, data, lazy=lazy, **kwargs)
+
     def get_last_message(self) -> Optional[Union[dict, Message]]:
         """
         Return the last message in the chat history, or None if the history is empty.
@@ -0,0 +1,169 @@
+from importlib.util import find_spec
+from typing import Any, Optional
+import os
+import threading
+
+# Providers whose litellm handlers take an `openai.OpenAI` client, other providers take an `HTTPHandler`
+OPENAI_CLIENT_PROVIDERS = ("openai", "custom_openai", "text-completion-openai")
+# Providers whose litellm handlers only accept their own SDK client, these use litellm's client
+SDK_CLIENT_PROVIDERS = ("azure", "azure_text")
+# Sent to OpenAI compatible servers that need no key (vLLM, Ollama), the OpenAI client requires one
+PLACEHOLDER_API_KEY = "sk-no-key"
+
+
+class ConnectionPool:
+    """
+    Pooled HTTP clients shared by many Chat instances, one per provider and api_base.
+
+    Connections are kept alive between requests, so short conversations reuse warm
+    connections instead of paying for TCP and TLS handshakes on every turn.
+    HTTP/2 is used when the `h2` package is installed.
+    `client_for` and `async_client_for` return clients for litellm's `client` argument
+    of `completion` and `acompletion`.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 600.0,
+        connect_timeout: float = 5.0,
+        http2: Optional[bool] = None,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.http2 = find_spec("h2") is not None if http2 is None else http2
+        self._clients: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _httpx_options(self) -> dict:
+        import httpx
+
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "timeout": httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            "http2": self.http2,
+            "follow_redirects": True,
+        }
+
+    def _get(self, key: tuple, factory) -> Any:
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+            return client
+
+    def _provider(self, args: dict) -> tuple[str, Optional[str], Optional[str]]:
+        from litellm import get_llm_provider
+
+        _, provider, api_key, api_base = get_llm_provider(
+            model=args["model"],
+            custom_llm_provider=args.get("custom_llm_provider"),
+            api_base=args.get("api_base"),
+            api_key=args.get("api_key"),
+        )
+        return provider, args.get("api_key") or api_key, args.get("api_base") or api_base
+
+    def client_for(self, args: dict) -> Optional[Any]:
+        """
+        Return the pooled client for the `completion` request described by `args`,
+        or None if the request should use litellm's own client.
+        """
+        provider, api_key, api_base = self._provider(args)
+        if provider in SDK_CLIENT_PROVIDERS:
+            return None
+        if provider in OPENAI_CLIENT_PROVIDERS:
+            if not self._openai_key(api_key, api_base):
+                return None
+            return self._get(
+                ("openai", api_base, api_key),
+                lambda: self._openai_client(api_key, api_base, is_async=False),
+            )
+
+        def factory():
+            import httpx
+            from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+            return HTTPHandler(client=httpx.Client(**self._httpx_options()))
+
+        return self._get(("http", provider, api_base), factory)
+
+    def async_client_for(self, args: dict) -> Optional[Any]:
+        """
+        Return the pooled async client for the `acompletion` request described by `args`,
+        or None if the request should use litellm's own client.
+        """
+        provider, api_key, api_base = self._provider(args)
+        if provider in SDK_CLIENT_PROVIDERS:
+            return None
+        if provider in OPENAI_CLIENT_PROVIDERS:
+            if not self._openai_key(api_key, api_base):
+                return None
+            return self._get(
+                ("async_openai", api_base, api_key),
+                lambda: self._openai_client(api_key, api_base, is_async=True),
+            )
+
+        def factory():
+            import httpx
+            from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler
+
+            options = self._httpx_options()
+            transport = httpx.AsyncHTTPTransport(limits=options["limits"], http2=self.http2)
+            return AsyncHTTPHandler(timeout=options["timeout"], transport=transport)
+
+        return self._get(("async_http", provider, api_base), factory)
+
+    def _openai_key(self, api_key: Optional[str], api_base: Optional[str]) -> Optional[str]:
+        api_key = api_key or os.environ.get("OPENAI_API_KEY")
+        if api_key is None and api_base is not None:
+            return PLACEHOLDER_API_KEY  # a self-hosted server
+        return api_key
+
+    def _openai_client(self, api_key: Optional[str], api_base: Optional[str], is_async: bool) -> Any:
+        import httpx
+        from openai import AsyncOpenAI, OpenAI
+
+        api_key = self._openai_key(api_key, api_base)
+        if is_async:
+            return AsyncOpenAI(
+                api_key=api_key,
+                base_url=api_base,
+                http_client=httpx.AsyncClient(**self._httpx_options()),
+                max_retries=0,  # retries are done by litellm
+            )
+        return OpenAI(
+            api_key=api_key,
+            base_url=api_base,
+            http_client=httpx.Client(**self._httpx_options()),
+            max_retries=0,
+        )
+
+    def close(self) -> None:
+        """
+        Close the sync clients; async clients are closed with `aclose`.
+        """
+        with self._lock:
+            for key, client in list(self._clients.items()):
+                if not key[0].startswith("async"):
+                    client.close()
+                    del self._clients[key]
+
+    async def aclose(self) -> None:
+        with self._lock:
+            async_clients = [
+                (key, client) for key, client in self._clients.items() if key[0].startswith("async")
+            ]
+            for key, _ in async_clients:
+                del self._clients[key]
+        for _, client in async_clients:
+            await client.close()
@@ -0,0 +1,62 @@
+from hashlib import blake2b
+from typing import Protocol
+import re
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    raise ImportError("Embeddings require numpy - install it with: pip install prompete[semantic]") from None
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+class Embedder(Protocol):
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed texts as rows of unit-length float32 vectors.
+        """
+        ...
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder: lowercase words and word bigrams hashed into `dim` signed buckets.
+    Near-duplicate texts get similar vectors - good enough for tests and lexical matching.
+    """
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+
+    def _features(self, text: str) -> list[str]:
+        words = TOKEN_RE.findall(text.lower())
+        return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                vectors[row, digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        return normalize(vectors)
+
+
+class LiteLLMEmbedder:
+    """
+    Embeddings from a provider model through litellm `embedding`.
+    """
+
+    def __init__(self, model: str, **kwargs):
+        self.model = model
+        self.kwargs = kwargs
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        from litellm import embedding
+
+        response = embedding(model=self.model, input=texts, **self.kwargs)
+        return normalize([item["embedding"] for item in response.data])
@@ -0,0 +1,90 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, Union
+import traceback
+
+from llm_easy_tools import LLMFunction, ToolResult, process_tool_call
+from llm_easy_tools.schema_generator import get_name
+from llm_easy_tools.types import SimpleFunction, SimpleToolCall
+
+
+def make_tool_executor(kind: str = "inline", max_workers: Optional[int] = None) -> Optional[Executor]:
+    """
+    Create an executor for tool calls: "inline" (no executor), "thread" or "process".
+    The executor is meant to be shared by many Chat instances and shut down by the caller.
+    """
+    if kind == "inline":
+        return None
+    elif kind == "thread":
+        return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prompete-tool")
+    elif kind == "process":
+        return ProcessPoolExecutor(max_workers=max_workers)
+    else:
+        raise ValueError(f"Unsupported tool executor kind: {kind}")
+
+
+def _get_tool_calls(message) -> list[SimpleToolCall]:
+    # Plain dataclasses pickle much faster than the pydantic tool call objects from litellm
+    if getattr(message, "function_call", None):
+        function_call = message.function_call
+        return [SimpleToolCall(id="A", function=SimpleFunction(name=function_call.name, arguments=function_call.arguments))]
+    return [
+        SimpleToolCall(
+            id=tool_call.id,
+            function=SimpleFunction(name=tool_call.function.name, arguments=tool_call.function.arguments),
+        )
+        for tool_call in getattr(message, "tool_calls", None) or []
+    ]
+
+
+def _tools_for_call(
+    tool_call: SimpleToolCall,
+    tools: list[Union[LLMFunction, Callable]],
+    prefix_class,
+    case_insensitive: bool,
+) -> list[Union[LLMFunction, Callable]]:
+    # Only the matching tool is sent to the worker - with a prefix the name needs to be decoded first
+    if prefix_class is not None:
+        return tools
+    name = tool_call.function.name.lower() if case_insensitive else tool_call.function.name
+    return [tool for tool in tools if get_name(tool, case_insensitive=case_insensitive) == name]
+
+
+def run_tool_calls(
+    message,
+    tools: list[Union[LLMFunction, Callable]],
+    executor: Executor,
+    prefix_class=None,
+    fix_json_args: bool = True,
+    case_insensitive: bool = False,
+) -> list[ToolResult]:
+    """
+    Execute the tool calls from `message` in `executor`, returning results in the order of the calls.
+    Works like `llm_easy_tools.processor.process_message` but also with process pools.
+    Failures of the executor itself (for example unpicklable outputs) are reported in `ToolResult.error`.
+    """
+    tool_calls = _get_tool_calls(message)
+    futures = [
+        executor.submit(
+            process_tool_call,
+            tool_call,
+            _tools_for_call(tool_call, tools, prefix_class, case_insensitive),
+            prefix_class,
+            fix_json_args,
+            case_insensitive,
+        )
+        for tool_call in tool_calls
+    ]
+    results = []
+    for tool_call, future in zip(tool_calls, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(
+                ToolResult(
+                    tool_call_id=tool_call.id,
+                    name=tool_call.function.name,
+                    error=e,
+                    stack_trace=traceback.format_exc(),
+                )
+            )
+    return results
@@ -0,0 +1,132 @@
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Sequence
+import threading
+
+from prompete.embeddings import TOKEN_RE, Embedder, np
+
+
+def lexical_features(text: str) -> set[str]:
+    words = TOKEN_RE.findall(text.lower())
+    return {*words, *(f"{first} {second}" for first, second in zip(words, words[1:]))}
+
+
+def approximate_tokens(example: Any) -> int:
+    return len(str(example)) // 4 + 1
+
+
+class ExampleSelector:
+    """
+    Picks the few-shot examples most relevant to a request, within a token budget.
+
+    By default examples are matched lexically (TF-IDF over words and word bigrams) through an
+    inverted index kept in NumPy arrays, so a request only touches the examples sharing a term with it.
+    With an `embedder` the example embeddings are precomputed into a matrix and ranked by cosine similarity.
+    Selections are cached per input.
+
+    Expose it to templates through the renderer globals:
+
+        renderer.globals["select_examples"] = ExampleSelector(examples, text=lambda e: e["question"])
+
+        {% for example in select_examples(question, k=3, max_tokens=500) %}...{% endfor %}
+    """
+
+    def __init__(
+        self,
+        examples: Sequence[Any],
+        text: Callable[[Any], str] = str,  # the part of an example matched against requests
+        tokens: Callable[[Any], int] = approximate_tokens,  # prompt tokens taken by an example
+        embedder: Optional[Embedder] = None,
+        max_df: float = 0.2,  # lexical terms found in a larger share of examples are ignored
+        cache_size: int = 1024,
+        batch_size: int = 1024,
+    ):
+        self.examples = list(examples)
+        self.embedder = embedder
+        self.costs = np.fromiter((tokens(example) for example in self.examples), dtype=np.int64, count=len(self.examples))
+        texts = [text(example) for example in self.examples]
+        if embedder is None:
+            self._build_lexical_index(texts, max_df)
+        elif texts:
+            self.matrix = np.concatenate(
+                [embedder(texts[start : start + batch_size]) for start in range(0, len(texts), batch_size)]
+            )
+        else:
+            self.matrix = None  # nothing to embed, the dimension is unknown
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _build_lexical_index(self, texts: list[str], max_df: float) -> None:
+        vocabulary: dict[str, int] = {}
+        rows = []
+        columns = []
+        for row, text in enumerate(texts):
+            for feature in lexical_features(text):
+                columns.append(vocabulary.setdefault(feature, len(vocabulary)))
+                rows.append(row)
+        rows = np.array(rows, dtype=np.int64)
+        columns = np.array(columns, dtype=np.int64)
+        document_frequency = np.bincount(columns, minlength=len(vocabulary))
+        idf = np.log((len(texts) + 1) / (document_frequency + 1)) + 1
+        idf[document_frequency > max(1, max_df * len(texts))] = 0.0
+        norms = np.sqrt(np.bincount(rows, weights=idf[columns] ** 2, minlength=len(texts)))
+        order = np.argsort(columns, kind="stable")
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.posting_rows = rows[order]
+        self.posting_weights = (idf[columns] / np.maximum(norms[rows], 1e-12))[order]
+        self.posting_starts = np.concatenate([[0], np.cumsum(document_frequency)])
+
+    def scores(self, query: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate example indexes and their similarity to the query.
+        """
+        if not self.examples:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        if self.embedder is not None:
+            scores = self.matrix @ self.embedder([query])[0]
+            return np.arange(len(scores)), scores
+        ids = [self.vocabulary[feature] for feature in lexical_features(query) if feature in self.vocabulary]
+        ids = [i for i in ids if self.idf[i] > 0]
+        if not ids:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        starts = self.posting_starts[ids]
+        ends = self.posting_starts[np.array(ids) + 1]
+        rows = np.concatenate([self.posting_rows[start:end] for start, end in zip(starts, ends)])
+        weights = np.concatenate([self.posting_weights[start:end] for start, end in zip(starts, ends)])
+        weights *= np.repeat(self.idf[ids], ends - starts)
+        candidates, positions = np.unique(rows, return_inverse=True)
+        return candidates, np.bincount(positions, weights=weights)
+
+    def indexes(self, query: str, k: int = 3, max_tokens: Optional[int] = None) -> np.ndarray:
+        """
+        Indexes of the best `k` examples, most relevant first, cut to fit `max_tokens`.
+        """
+        key = (query, k, max_tokens)
+        with self._lock:
+            selected = self._cache.get(key)
+            if selected is not None:
+                self._cache.move_to_end(key)
+                return selected
+        candidates, scores = self.scores(query)
+        if len(candidates) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        selected = candidates[top[np.argsort(-scores[top], kind="stable")]]
+        if max_tokens is not None:
+            selected = selected[: np.searchsorted(np.cumsum(self.costs[selected]), max_tokens, side="right")]
+        selected.flags.writeable = False  # shared through the cache
+        with self._lock:
+            self._cache[key] = selected
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return selected
+
+    def select(self, query: str, k: int = 3, max_tokens: Optional[int] = None) -> list[Any]:
+        return [self.examples[index] for index in self.indexes(query, k, max_tokens)]
+
+    __call__ = select
+
+    def __len__(self) -> int:
+        return len(self.examples)
@@ -0,0 +1,214 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+import random
+import threading
+import time
+
+# Transient HTTP statuses: request timeout, conflict, rate limit - and every 5xx
+RETRYABLE_STATUS = (408, 409, 429)
+# Client library errors raised before any status is received (openai, httpx)
+TRANSIENT_ERRORS = ("APIConnectionError", "APITimeoutError", "TimeoutException", "TransportError")
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Only transient failures are retried: timeouts, connection errors and 408/409/429/5xx responses.
+    """
+    status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS or status >= 500
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+@dataclass
+class LatencyMetrics:
+    requests: int = 0
+    attempts: int = 0
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    failures: int = 0
+    budget_denied: int = 0
+
+
+class LatencyPolicy:
+    """
+    Retries, per-attempt deadlines and hedged requests for `Chat.llm_reply`.
+
+    - every attempt gets `attempt_timeout` seconds (passed to litellm as `timeout`),
+    - failed attempts are retried up to `max_attempts` with exponential backoff that grows
+      with the error rate observed over the last `window` attempts,
+    - with `hedge=True` a duplicate request is sent when the first one takes longer than the
+      `hedge_percentile` latency of recent requests, and the first answer wins; at most
+      `max_hedges` duplicates are in flight at once, further slow requests are not hedged,
+    - retries and hedges together may add at most `budget_ratio` extra requests per request
+      (plus `budget_burst`), so that an outage does not multiply spend.
+
+    One policy is meant to be shared by the chats calling the same backend - it does not limit
+    their concurrency: a hedged request starts its first attempt on a thread of its own.
+    """
+
+    def __init__(
+        self,
+        attempt_timeout: Optional[float] = None,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        hedge: bool = False,
+        hedge_percentile: float = 95,
+        hedge_min_samples: int = 20,
+        budget_ratio: float = 0.2,
+        budget_burst: int = 10,
+        window: int = 1000,
+        max_hedges: int = 32,
+    ):
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.budget_ratio = budget_ratio
+        self.budget_burst = budget_burst
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._outcomes: deque[bool] = deque(maxlen=window)  # True for failed attempts
+        self._metrics = LatencyMetrics()
+        self._lock = threading.Lock()
+        self.max_hedges = max_hedges
+        self._hedge_slots = threading.BoundedSemaphore(max_hedges)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def error_rate(self) -> float:
+        with self._lock:
+            return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Delay before retry number `attempt` - longer when many recent attempts failed.
+        """
+        delay = self.backoff_base * 2 ** (attempt - 1) * (1 + 4 * self.error_rate())
+        return min(self.backoff_max, delay) * random.uniform(0.5, 1.0)
+
+    def _spend_extra(self) -> bool:
+        with self._lock:
+            extra = self._metrics.retries + self._metrics.hedges
+            if extra < self._metrics.requests * self.budget_ratio + self.budget_burst:
+                return True
+            self._metrics.budget_denied += 1
+            return False
+
+    def _attempt(self, send: Callable[..., Any], args: dict) -> Any:
+        if self.attempt_timeout is not None:
+            args = {**args, "timeout": self.attempt_timeout}
+        start = time.monotonic()
+        try:
+            result = send(**args)
+        except Exception:
+            with self._lock:
+                self._outcomes.append(True)
+            raise
+        with self._lock:
+            self._outcomes.append(False)
+            self._latencies.append(time.monotonic() - start)
+        return result
+
+    def run(self, send: Callable[..., Any], args: dict) -> Any:
+        """
+        Call `send(**args)` under the policy and return the first successful result.
+        """
+        with self._lock:
+            self._metrics.requests += 1
+        attempt = 1
+        while True:
+            with self._lock:
+                self._metrics.attempts += 1
+            try:
+                if self.hedge:
+                    return self._hedged(send, args)
+                return self._attempt(send, args)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e) or not self._spend_extra():
+                    with self._lock:
+                        self._metrics.failures += 1
+                    raise
+            time.sleep(self.backoff(attempt))
+            attempt += 1
+            with self._lock:
+                self._metrics.retries += 1
+
+    def _hedged(self, send: Callable[..., Any], args: dict) -> Any:
+        hedge_after = self.latency_percentile(self.hedge_percentile)
+        if hedge_after is None:
+            return self._attempt(send, args)
+        primary = self._start(send, args)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done or not self._hedge_slots.acquire(blocking=False):
+            return primary.result()
+        if not self._spend_extra():
+            self._hedge_slots.release()
+            return primary.result()
+        with self._lock:
+            self._metrics.hedges += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_hedges, thread_name_prefix="prompete-hedge")
+        hedge = self._executor.submit(self._attempt, send, args)
+        hedge.add_done_callback(lambda _: self._hedge_slots.release())
+        return self._first_result([primary, hedge], hedge)
+
+    def _start(self, send: Callable[..., Any], args: dict) -> Future:
+        """
+        Run an attempt on its own thread, so that a shared pool never queues first attempts.
+        """
+        future: Future = Future()
+
+        def attempt():
+            try:
+                future.set_result(self._attempt(send, args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=attempt, name="prompete-attempt", daemon=True).start()
+        return future
+
+    def _first_result(self, futures: list[Future], hedge: Future) -> Any:
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self._metrics.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def metrics(self) -> dict:
+        """
+        Counters and rates of retries and hedges.
+        """
+        with self._lock:
+            metrics = vars(self._metrics).copy()
+        requests = metrics["requests"] or 1
+        metrics["retry_rate"] = metrics["retries"] / requests
+        metrics["hedge_rate"] = metrics["hedges"] / requests
+        metrics["error_rate"] = self.error_rate()
+        metrics["hedge_after"] = self.latency_percentile(self.hedge_percentile)
+        return metrics
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,274 @@
+"""
+Soak test harness: drives many concurrent Chat sessions against a local fake provider
+and reports throughput, latency percentiles, RSS over time and allocation hotspots.
+
+    python -m prompete.loadtest --sessions 10000 --concurrency 200 --turns 3 --error-rate 0.01
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from jinja2 import DictLoader, Environment
+
+from prompete.chat import Chat, Prompt, SystemPrompt
+from prompete.registry import ToolSet
+from prompete.store import ContentStore
+
+TEMPLATES = {
+    "LoadTestSystemPrompt": "You are a support assistant for {{ product }}.\n{{ instructions }}",
+    "QuestionPrompt": "Customer {{ customer }} asks (turn {{ turn }}): what is the status of order {{ order_id }}?",
+}
+
+
+@dataclass(frozen=True)
+class LoadTestSystemPrompt(SystemPrompt):
+    product: str
+    instructions: str
+
+
+@dataclass(frozen=True)
+class QuestionPrompt(Prompt):
+    customer: int
+    turn: int
+    order_id: str
+
+
+def order_status(order_id: str) -> str:
+    """Get the status of an order"""
+    return f"Order {order_id} shipped"
+
+
+class FakeProviderError(Exception):
+    status_code = 503
+
+
+class FakeProvider:
+    """
+    Stand-in for `completion` with tunable latency and error injection.
+    Answers requests offering tools with a tool call and all other requests with text.
+    """
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.5, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self, **args):
+        from litellm import ModelResponse
+
+        with self._lock:
+            self.calls += 1
+            call_id = self.calls
+            delay = self.latency * (1 + self._random.uniform(-self.jitter, self.jitter))
+            fail = self._random.random() < self.error_rate
+        time.sleep(max(delay, 0))
+        if fail:
+            raise FakeProviderError("injected provider error")
+        last = args["messages"][-1]
+        if args.get("tools") and last["role"] == "user":
+            name = args["tools"][0]["function"]["name"]
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {
+                        "id": f"call_{call_id}",
+                        "type": "function",
+                        "function": {"name": name, "arguments": json.dumps({"order_id": str(call_id)})},
+                    }
+                ],
+            }
+        else:
+            message = {"role": "assistant", "content": f"Here is what I found: {last['content'][:200]}"}
+        return ModelResponse(choices=[{"message": message}], model=args["model"])
+
+
+@dataclass
+class LoadTestConfig:
+    sessions: int = 1000
+    concurrency: int = 50
+    turns: int = 3
+    use_tools: bool = True
+    system_prompt_size: int = 10_000  # characters of instructions in the system prompt
+    latency: float = 0.05
+    jitter: float = 0.5
+    error_rate: float = 0.0
+    share_content: bool = False  # intern system prompts and small tool results in a shared ContentStore
+    sample_interval: float = 0.5  # seconds between RSS samples
+    trace_allocations: bool = False
+    top_allocations: int = 10
+    seed: Optional[int] = None
+
+
+@dataclass
+class LoadTestReport:
+    sessions: int
+    turns: int
+    errors: int
+    duration: float
+    latencies: list[float] = field(repr=False)
+    rss_samples: list[tuple[float, int]] = field(repr=False)
+    allocation_hotspots: list[str] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return self.turns / self.duration if self.duration else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100))]
+
+    @property
+    def peak_rss(self) -> int:
+        return max((rss for _, rss in self.rss_samples), default=0)
+
+    def format(self) -> str:
+        lines = [
+            f"sessions: {self.sessions}, turns: {self.turns}, errors: {self.errors}",
+            f"duration: {self.duration:.2f}s, throughput: {self.throughput:.1f} turns/s",
+            "latency: " + ", ".join(f"p{p} {self.percentile(p) * 1000:.1f}ms" for p in (50, 90, 99)),
+            f"peak RSS: {self.peak_rss / 2**20:.1f} MiB",
+            "RSS over time: "
+            + ", ".join(f"{elapsed:.1f}s {rss / 2**20:.1f} MiB" for elapsed, rss in self.rss_samples),
+        ]
+        if self.allocation_hotspots:
+            lines.append("allocation hotspots:")
+            lines.extend(f"  {hotspot}" for hotspot in self.allocation_hotspots)
+        return "\n".join(lines)
+
+
+def current_rss() -> int:
+    """
+    Resident set size of this process in bytes (peak RSS where /proc is not available).
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource  # not available on Windows
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, kilobytes elsewhere
+
+
+def run_load_test(config: LoadTestConfig) -> LoadTestReport:
+    provider = FakeProvider(config.latency, config.jitter, config.error_rate, config.seed)
+    renderer = Environment(loader=DictLoader(TEMPLATES))
+    store = ContentStore() if config.share_content else None
+    instructions = ("Answer politely and precisely. " * (config.system_prompt_size // 31 + 1))[: config.system_prompt_size]
+    tools = ToolSet([order_status] if config.use_tools else [])
+    chats: list[Chat] = []
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def run_session(session: int, record: bool = True) -> None:
+        nonlocal errors
+        chat = Chat(
+            model="fake-model",
+            renderer=renderer,
+            system_prompt=LoadTestSystemPrompt(product="Prompete", instructions=instructions),
+            transport=provider,
+            content_store=store,
+            retries=0,
+        )
+        for turn in range(config.turns):
+            start = time.perf_counter()
+            try:
+                chat(QuestionPrompt(customer=session, turn=turn, order_id=f"{session}-{turn}"), tools=tools)
+                if tools:
+                    chat.process()
+                    chat.llm_reply()
+                elapsed = time.perf_counter() - start
+                if record:
+                    with lock:
+                        latencies.append(elapsed)
+            except FakeProviderError:
+                if record:
+                    with lock:
+                        errors += 1
+        if record:
+            with lock:
+                chats.append(chat)  # sessions stay alive to measure the memory they hold
+
+    # one unmeasured session imports the provider libraries and compiles the templates
+    run_session(-1, record=False)
+
+    rss_samples: list[tuple[float, int]] = []
+    done = threading.Event()
+    started = time.perf_counter()
+
+    def sample_rss() -> None:
+        while True:
+            rss_samples.append((time.perf_counter() - started, current_rss()))
+            if done.wait(config.sample_interval):
+                break
+
+    if config.trace_allocations:
+        tracemalloc.start()
+    sampler = threading.Thread(target=sample_rss, daemon=True)
+    sampler.start()
+    with ThreadPoolExecutor(max_workers=config.concurrency) as executor:
+        list(executor.map(run_session, range(config.sessions)))
+    duration = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    rss_samples.append((duration, current_rss()))
+
+    hotspots = []
+    if config.trace_allocations:
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        for stat in snapshot.statistics("lineno")[: config.top_allocations]:
+            frame = stat.traceback[0]
+            hotspots.append(f"{frame.filename}:{frame.lineno}: {stat.size / 2**10:.1f} KiB in {stat.count} blocks")
+
+    return LoadTestReport(
+        sessions=config.sessions,
+        turns=len(latencies),
+        errors=errors,
+        duration=duration,
+        latencies=latencies,
+        rss_samples=rss_samples,
+        allocation_hotspots=hotspots,
+    )
+
+
+def main(argv: Optional[list[str]] = None) -> LoadTestReport:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = LoadTestConfig()
+    parser.add_argument("--sessions", type=int, default=defaults.sessions)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--turns", type=int, default=defaults.turns)
+    parser.add_argument("--no-tools", dest="use_tools", action="store_false")
+    parser.add_argument("--system-prompt-size", type=int, default=defaults.system_prompt_size)
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="mean fake provider latency in seconds")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--share-content", action="store_true")
+    parser.add_argument("--sample-interval", type=float, default=defaults.sample_interval)
+    parser.add_argument("--trace-allocations", action="store_true")
+    parser.add_argument("--top-allocations", type=int, default=defaults.top_allocations)
+    parser.add_argument("--seed", type=int, default=None)
+    config = LoadTestConfig(**vars(parser.parse_args(argv)))
+    report = run_load_test(config)
+    print(report.format())
+    return report
+
+
+if __name__ == "__main__":
+    main()
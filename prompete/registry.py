@@ -0,0 +1,236 @@
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional, Union
+import threading
+
+_tools: dict[str, Any] = {}
+_tool_names: dict[int, str] = {}
+_lock = threading.Lock()
+
+
+def _default_name(tool: Any) -> str:
+    schema = getattr(tool, "schema", None)
+    if isinstance(schema, dict) and "name" in schema:
+        return schema["name"]
+    return tool.__name__
+
+
+def register_tool(tool: Optional[Any] = None, *, name: Optional[str] = None) -> Any:
+    """
+    Register a tool (function, LLMFunction or pydantic model) under a name, so that chats can
+    refer to it by name when they are serialized. Can be used as a decorator.
+    """
+    if tool is None:
+        return lambda tool: register_tool(tool, name=name)
+    name = name or _default_name(tool)
+    with _lock:
+        registered = _tools.get(name)
+        if registered is not None and registered is not tool:
+            raise ValueError(f"Another tool is already registered as {name}")
+        _tools[name] = tool
+        _tool_names[id(tool)] = name
+    return tool
+
+
+def get_tool(name: str) -> Any:
+    try:
+        return _tools[name]
+    except KeyError:
+        raise ValueError(f"Tool {name} is not registered") from None
+
+
+def tool_name(tool: Any) -> str:
+    """
+    Name under which `tool` was registered.
+    """
+    name = _tool_names.get(id(tool))
+    if name is None or _tools.get(name) is not tool:
+        raise ValueError(f"Tool {_default_name(tool)} is not registered - use register_tool")
+    return name
+
+
+def resolve_tools(names: list[str]) -> list[Callable]:
+    return [get_tool(name) for name in names]
+
+
+class ToolSet(list):
+    """
+    A list of tools whose schemas are computed once and reused by every chat using it.
+    """
+
+    response_format: Optional[type] = None  # set when the tool set only emulates a response_format
+
+    def __init__(self, tools=()):
+        super().__init__(tools)
+        self._tool_defs: dict[bool, list[dict]] = {}
+
+    def _changed(self) -> None:
+        self._tool_defs = {}  # not cleared in place, copies may share the schemas
+
+    def copy(self) -> "ToolSet":
+        """
+        A ToolSet with the same tools, sharing the schemas computed so far until either one is changed.
+        """
+        tools = ToolSet(self)
+        tools.response_format = self.response_format
+        tools._tool_defs = self._tool_defs
+        return tools
+
+    def tool_defs(self, strict: bool = False) -> list[dict]:
+        tool_defs = self._tool_defs.get(strict)
+        if tool_defs is None:
+            from prompete.chat import get_tool_defs
+
+            tool_defs = get_tool_defs(list(self), strict=strict)
+            self._tool_defs[strict] = tool_defs
+        return tool_defs
+
+
+def _clearing_cache(name: str):
+    method = getattr(list, name)
+
+    def mutator(self, *args):
+        result = method(self, *args)
+        self._changed()
+        return result
+
+    mutator.__name__ = name
+    return mutator
+
+
+# the cached schemas must follow any change to the list
+for _name in (
+    "append", "extend", "insert", "remove", "pop", "clear", "sort", "reverse",
+    "__setitem__", "__delitem__", "__iadd__", "__imul__",
+):
+    setattr(ToolSet, _name, _clearing_cache(_name))
+
+
+@dataclass
+class ModelProfile:
+    model: str
+    custom_llm_provider: Optional[str] = None
+    emulate_response_format: Optional[bool] = None
+    chat_options: dict = field(default_factory=dict)  # other Chat fields, like retries or a shared scheduler
+
+
+class Registry:
+    """
+    Application-level declarations of templates, prompts, tool sets and model profiles.
+
+    Everything is declared once at import time; `warm_up` (called at worker start) compiles the
+    templates, renders the registered prompts, builds the tool schemas and probes the models.
+    After that `chat` builds Chat instances without any rendering or reflection.
+    """
+
+    def __init__(self, renderer: Optional[Any] = None, **environment_options):
+        self.templates: dict[str, str] = {}
+        self._renderer = renderer
+        self._environment_options = environment_options
+        self._prompts: dict[str, Any] = {}
+        self._messages: dict[str, dict] = {}
+        self._tool_sets: dict[str, tuple[ToolSet, bool]] = {}
+        self._models: dict[str, ModelProfile] = {}
+        self._prompt_classes: list[type] = []
+
+    @property
+    def renderer(self) -> Any:
+        if self._renderer is None:
+            from jinja2 import DictLoader, Environment
+
+            self._renderer = Environment(loader=DictLoader(self.templates), **self._environment_options)
+        return self._renderer
+
+    def template(self, prompt_class: Union[type, str], source: str) -> None:
+        """
+        Declare the template of a Prompt class (or of a template name).
+        """
+        name = prompt_class if isinstance(prompt_class, str) else prompt_class.__name__
+        if not isinstance(prompt_class, str):
+            self._prompt_classes.append(prompt_class)
+        self.templates[name] = source
+
+    def prompt(self, name: str, prompt: Any) -> None:
+        """
+        Declare a prompt (Prompt object, string or message dict) that chats can start with.
+        """
+        self._prompts[name] = prompt
+        self._messages.pop(name, None)
+
+    def tools(self, name: str, tools: list, strict: bool = False) -> ToolSet:
+        """
+        Declare a named tool set - its tools are also registered by name for serialization.
+        """
+        for tool in tools:
+            register_tool(tool)
+        tool_set = ToolSet(tools)
+        self._tool_sets[name] = (tool_set, strict)
+        return tool_set
+
+    def model(self, name: str, model: str, custom_llm_provider: Optional[str] = None, **chat_options) -> ModelProfile:
+        emulate_response_format = chat_options.pop("emulate_response_format", None)
+        profile = ModelProfile(model, custom_llm_provider, emulate_response_format, chat_options)
+        self._models[name] = profile
+        return profile
+
+    def get_tools(self, name: str) -> ToolSet:
+        return self._tool_sets[name][0]
+
+    def message(self, name: str) -> dict:
+        """
+        The rendered system message of a declared prompt.
+        """
+        message = self._messages.get(name)
+        if message is None:
+            from prompete.chat import Chat
+
+            prompt = self._prompts[name]
+            renderer = self.renderer if self.templates or self._renderer is not None else None
+            # chats use declared prompts as system prompts, like Chat(system_prompt=...)
+            message = {**Chat(model="", renderer=renderer).make_message(prompt), "role": "system"}
+            self._messages[name] = message
+        return message
+
+    def warm_up(self) -> None:
+        """
+        Precompute everything chats need: compile templates, render prompts, build tool schemas,
+        probe model capabilities and import the provider libraries.
+        """
+        import litellm  # noqa: F401 - the first import takes seconds, even if no capability is probed
+
+        from prompete.chat import _public_class_names, supports_param
+
+        for name in self.templates:
+            self.renderer.get_template(name)
+        for prompt_class in self._prompt_classes:
+            _public_class_names(prompt_class)
+        for name in self._prompts:
+            self.message(name)
+        for tool_set, strict in self._tool_sets.values():
+            tool_set.tool_defs(strict=strict)
+        for profile in self._models.values():
+            if profile.emulate_response_format is None:
+                profile.emulate_response_format = not supports_param(
+                    profile.model, profile.custom_llm_provider, "response_format"
+                )
+
+    def chat(self, model: str, prompt: Optional[str] = None, **kwargs):
+        """
+        New Chat for a declared model profile, starting with a declared prompt.
+        """
+        from prompete.chat import Chat
+
+        profile = self._models[model]
+        options = {
+            "model": profile.model,
+            "custom_llm_provider": profile.custom_llm_provider,
+            "emulate_response_format": profile.emulate_response_format,
+            **profile.chat_options,
+            **kwargs,
+        }
+        if self.templates or self._renderer is not None:
+            options.setdefault("renderer", self.renderer)
+        chat = Chat(**options)
+        if prompt is not None:
+            chat.append(dict(self.message(prompt)))  # chats share the content, not the mutable dict
+            chat.system_prompt = self._prompts[prompt]
+        return chat
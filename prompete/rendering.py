@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+import itertools
+import threading
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+
+class FragmentCache:
+    """
+    Bounded LRU cache of rendered template fragments.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._fragments: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_render(self, key: Hashable, render: Callable[[], str]) -> str:
+        with self._lock:
+            fragment = self._fragments.get(key)
+            if fragment is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return fragment
+            self.misses += 1
+        fragment = render()
+        with self._lock:
+            self._fragments[key] = fragment
+            if len(self._fragments) > self.maxsize:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
+
+
+def _hashable(value: Any) -> Hashable:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+class CachedExtension(Extension):
+    """
+    Jinja2 extension with a `{% cached %}` tag that renders its body once and reuses the output:
+
+        {% cached %}
+        ... long static instructions ...
+        {% endcached %}
+
+    Expressions after the tag become the cache key, for parts that depend on a few values only:
+
+        {% cached language %}...{{ language }}...{% endcached %}
+
+    Text outside `cached` blocks is rendered on every call as usual. Jinja already compiles plain
+    template text to constants, so the tag pays off for blocks with loops, filters, includes or macros.
+    The cache is `environment.fragment_cache`; recompiling a changed template starts with fresh entries.
+    """
+
+    tags = {"cached"}
+    _blocks = itertools.count()
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=FragmentCache())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        keys = []
+        while parser.stream.current.type != "block_end":
+            if keys:
+                parser.stream.expect("comma")
+            keys.append(parser.parse_expression())
+        block_id = f"{parser.name}:{lineno}:{next(self._blocks)}"
+        body = parser.parse_statements(("name:endcached",), drop_needle=True)
+        call = self.call_method("_render_cached", [nodes.Const(block_id), nodes.List(keys)])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_cached(self, block_id: str, keys: list, caller: Callable[[], str]) -> str:
+        key = (block_id, tuple(_hashable(key) for key in keys))
+        return self.environment.fragment_cache.get_or_render(key, caller)
@@ -0,0 +1,57 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+# Picks one of the valid results - returns its index in the list
+Aggregator = Callable[[list[Any]], int]
+
+
+def _vote_key(result: Any) -> str:
+    if hasattr(result, "model_dump_json"):
+        return result.model_dump_json()
+    return str(result).strip()
+
+
+def majority_vote(results: list[Any]) -> int:
+    """
+    Index of the most common result - the first of them on ties.
+    """
+    keys = [_vote_key(result) for result in results]
+    winner, _ = Counter(keys).most_common(1)[0]
+    return keys.index(winner)
+
+
+@dataclass
+class Samples:
+    """
+    All choices returned by `Chat.sample` and the one selected by the aggregator.
+    `results` holds the parsed result of each choice, or the exception raised when validating it.
+    """
+
+    results: list[Any]
+    messages: list[Any]
+    selected: int
+
+    @property
+    def value(self) -> Any:
+        return self.results[self.selected]
+
+    @property
+    def valid(self) -> list[Any]:
+        return [result for result in self.results if not isinstance(result, Exception)]
+
+    @property
+    def errors(self) -> list[Exception]:
+        return [result for result in self.results if isinstance(result, Exception)]
+
+
+def select(results: list[Any], aggregate: Optional[Aggregator] = None) -> int:
+    """
+    Index (in `results`) of the valid result chosen by `aggregate`.
+    Raises the first validation error when no result is valid.
+    """
+    valid_indexes = [i for i, result in enumerate(results) if not isinstance(result, Exception)]
+    if not valid_indexes:
+        raise results[0]
+    aggregate = aggregate or majority_vote
+    return valid_indexes[aggregate([results[i] for i in valid_indexes])]
@@ -0,0 +1,122 @@
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Callable, Optional, TypeVar
+import heapq
+import itertools
+import threading
+import time
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """
+    Request priorities - lower values are served first.
+    """
+
+    INTERACTIVE = 0
+    BATCH = 10
+
+
+@dataclass
+class BackendStats:
+    in_flight: int = 0
+    queue_depth: int = 0
+    completed: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+    recent_waits: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    def wait_percentile(self, percentile: float) -> float:
+        if not self.recent_waits:
+            return 0.0
+        waits = sorted(self.recent_waits)
+        index = min(len(waits) - 1, int(len(waits) * percentile / 100))
+        return waits[index]
+
+    def summary(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "mean_wait": self.total_wait / self.completed if self.completed else 0.0,
+            "p95_wait": self.wait_percentile(95),
+            "max_wait": self.max_wait,
+        }
+
+
+class _Backend:
+    def __init__(self, max_in_flight: int):
+        self.max_in_flight = max_in_flight
+        self.waiting: list = []  # heap of (priority, sequence, event)
+        self.stats = BackendStats()
+
+
+class RequestScheduler:
+    """
+    Keeps up to `max_in_flight` requests running against each backend and queues the rest,
+    serving queued requests by priority and then in arrival order.
+
+    Meant for self-hosted OpenAI-compatible servers (vLLM, llama.cpp, Ollama) that batch
+    concurrent requests internally. One scheduler is shared by all Chat instances of a process;
+    backends are identified by the `api_base`, `custom_llm_provider` or model of the request.
+    """
+
+    def __init__(self, max_in_flight: int = 8, backend_limits: Optional[dict[str, int]] = None):
+        self.max_in_flight = max_in_flight
+        self.backend_limits = backend_limits or {}
+        self._backends: dict[str, _Backend] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+
+    def _backend(self, name: str) -> _Backend:
+        backend = self._backends.get(name)
+        if backend is None:
+            backend = _Backend(self.backend_limits.get(name, self.max_in_flight))
+            self._backends[name] = backend
+        return backend
+
+    def run(self, backend_name: str, request: Callable[[], T], priority: int = Priority.INTERACTIVE) -> T:
+        """
+        Run `request` once the backend has a free slot and return its result.
+        """
+        start = time.monotonic()
+        with self._lock:
+            backend = self._backend(backend_name)
+            if backend.stats.in_flight < backend.max_in_flight and not backend.waiting:
+                backend.stats.in_flight += 1
+                event = None
+            else:
+                event = threading.Event()
+                heapq.heappush(backend.waiting, (priority, next(self._sequence), event))
+                backend.stats.queue_depth = len(backend.waiting)
+        if event is not None:
+            # the releasing request hands its slot over before setting the event
+            event.wait()
+        wait = time.monotonic() - start
+        try:
+            return request()
+        finally:
+            self._release(backend, wait)
+
+    def _release(self, backend: _Backend, wait: float) -> None:
+        with self._lock:
+            stats = backend.stats
+            stats.completed += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+            stats.recent_waits.append(wait)
+            if backend.waiting:
+                _, _, event = heapq.heappop(backend.waiting)
+                stats.queue_depth = len(backend.waiting)
+                event.set()
+            else:
+                stats.in_flight -= 1
+
+    def stats(self) -> dict[str, dict]:
+        """
+        Queue depth, requests in flight and wait times for each backend.
+        """
+        with self._lock:
+            return {name: backend.stats.summary() for name, backend in self._backends.items()}
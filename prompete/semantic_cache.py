@@ -0,0 +1,142 @@
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Any, Optional
+import threading
+
+from prompete.embeddings import Embedder, HashingEmbedder, np
+
+
+@dataclass(frozen=True)
+class CacheKey:
+    scope: tuple[str, str, str]  # model, system prompt digest, response_format name
+    text: str
+    vector: np.ndarray
+
+
+class _Index:
+    """
+    Unit vectors of one scope in a growing matrix, with the least recently used row evicted when full.
+    """
+
+    def __init__(self, dim: int, max_entries: int):
+        self.max_entries = max_entries
+        self.vectors = np.zeros((min(16, max_entries), dim), dtype=np.float32)
+        self.last_used = np.zeros(len(self.vectors), dtype=np.int64)
+        self.answers: list[str] = []
+
+    def search(self, vector: np.ndarray) -> tuple[int, float]:
+        size = len(self.answers)
+        if not size:
+            return -1, -1.0
+        scores = self.vectors[:size] @ vector
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def add(self, vector: np.ndarray, answer: str, tick: int) -> bool:
+        """
+        Store an answer, return True when an older entry was evicted for it.
+        """
+        size = len(self.answers)
+        if size < self.max_entries:
+            if size == len(self.vectors):
+                capacity = min(2 * size, self.max_entries)
+                self.vectors = np.resize(self.vectors, (capacity, self.vectors.shape[1]))
+                self.last_used = np.resize(self.last_used, capacity)
+            self.answers.append(answer)
+            row, evicted = size, False
+        else:
+            row, evicted = int(np.argmin(self.last_used)), True
+            self.answers[row] = answer
+        self.vectors[row] = vector
+        self.last_used[row] = tick
+        return evicted
+
+
+class SemanticCache:
+    """
+    Answers of `Chat.__call__` reused for similar questions.
+
+    The question opening a conversation is embedded and compared (cosine similarity) with the questions
+    answered before with the same model, system prompt and response_format; an answer is reused when the
+    similarity is at least `threshold`. Every scope keeps up to `max_entries` answers, evicting
+    the least recently used. Follow-up questions, whose meaning depends on the earlier turns,
+    and calls with tools are never cached.
+    Requires numpy: pip install prompete[semantic]
+    """
+
+    def __init__(self, embedder: Optional[Embedder] = None, threshold: float = 0.95, max_entries: int = 10_000):
+        self.embedder = embedder or HashingEmbedder()
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._indexes: dict[tuple[str, str, str], _Index] = {}
+        self._tick = 0
+        self._lock = threading.Lock()
+
+    def key(self, model: str, messages: list, response_format=None) -> Optional[CacheKey]:
+        """
+        The cache key of the question ending `messages`, None if earlier turns precede it.
+        """
+        if not messages or any(message["role"] != "system" for message in messages[:-1]):
+            return None
+        system = "\n".join(str(message["content"]) for message in messages[:-1])
+        digest = blake2b(system.encode("utf-8"), digest_size=16).hexdigest()
+        format_name = "" if response_format is None else f"{response_format.__module__}.{response_format.__qualname__}"
+        text = str(messages[-1]["content"])
+        return CacheKey((model, digest, format_name), text, self.embedder([text])[0])
+
+    def get(self, key: CacheKey, response_format=None) -> Optional[Any]:
+        """
+        The answer to a similar question, the validated response_format object for structured answers,
+        or None.
+        """
+        with self._lock:
+            self._tick += 1
+            index = self._indexes.get(key.scope)
+            row, score = index.search(key.vector) if index is not None else (-1, -1.0)
+            if score < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            index.last_used[row] = self._tick
+            answer = index.answers[row]
+        if response_format is not None:
+            return response_format.model_validate_json(answer)
+        return answer
+
+    def put(self, key: CacheKey, result: Any) -> None:
+        if result is None:
+            return
+        answer = result if isinstance(result, str) else result.model_dump_json()
+        with self._lock:
+            self._tick += 1
+            index = self._indexes.get(key.scope)
+            if index is None:
+                index = self._indexes[key.scope] = _Index(len(key.vector), self.max_entries)
+            row, score = index.search(key.vector)
+            if score >= 1.0 - 1e-6:
+                index.answers[row] = answer
+                index.last_used[row] = self._tick
+            elif index.add(key.vector, answer, self._tick):
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return sum(len(index.answers) for index in self._indexes.values())
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": sum(len(index.answers) for index in self._indexes.values()),
+                "scopes": len(self._indexes),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
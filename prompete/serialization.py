@@ -0,0 +1,112 @@
+from typing import Any, Union
+import json
+import struct
+
+from prompete.registry import resolve_tools, tool_name
+from prompete.store import LazyContent
+
+MAGIC = b"PRCH\x01"
+HEADER_LENGTH = struct.Struct(">I")
+BLOB_THRESHOLD = 1024  # contents longer than this are stored after the header as raw UTF-8
+
+# Chat fields that hold plain data - everything else (renderer, stores, pools, executors)
+# belongs to the process and is passed to `load_chat`
+DATA_FIELDS = (
+    "model",
+    "fail_on_tool_error",
+    "one_tool_per_step",
+    "retries",
+    "custom_llm_provider",
+    "emulate_response_format",
+    "keep_response_format_result",
+    "priority",
+)
+
+
+class BlobContent(LazyContent):
+    """
+    Message content decoded from the buffer the chat was loaded from on first access, then kept as text.
+    """
+
+    def __init__(self, buffer: memoryview, start: int, length: int):
+        super().__init__()
+        self._buffer = buffer
+        self._start = start
+        self._length = length
+
+    def _load(self) -> str:
+        self._data = str(self._buffer[self._start : self._start + self._length], "utf-8")
+        self._buffer = None  # the decoded text replaces the view into the buffer
+        return self._data
+
+
+def _message_dict(message: Any) -> dict:
+    if isinstance(message, dict):
+        return message
+    return message.model_dump()
+
+
+def dump_chat(chat) -> bytes:
+    """
+    Serialize the data of a chat: a JSON header followed by the large message bodies as raw UTF-8.
+    Tools are stored by their registered names.
+    """
+    messages = []
+    blobs = []
+    blob_parts = []
+    blob_size = 0
+    for index, message in enumerate(chat.messages):
+        message = _message_dict(message)
+        content = message.get("content")
+        if isinstance(content, LazyContent):
+            content = str(content)
+            message = {**message, "content": content}
+        if isinstance(content, str) and len(content) > BLOB_THRESHOLD:
+            encoded = content.encode("utf-8")
+            blobs.append((index, blob_size, len(encoded)))
+            blob_parts.append(encoded)
+            blob_size += len(encoded)
+            message = {**message, "content": None}
+        messages.append(message)
+
+    # the tool emulating a response_format is not a user tool and need not be registered
+    saved_tools = [] if getattr(chat.saved_tools, "response_format", None) else chat.saved_tools
+    header = {
+        "fields": {name: getattr(chat, name) for name in DATA_FIELDS},
+        "tools": [tool_name(tool) for tool in saved_tools],
+        "messages": messages,
+        "blobs": blobs,
+    }
+    encoded_header = json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return b"".join([MAGIC, HEADER_LENGTH.pack(len(encoded_header)), encoded_header, *blob_parts])
+
+
+def load_chat(cls, data: Union[bytes, bytearray, memoryview], lazy: bool = False, **kwargs):
+    """
+    Rebuild a chat serialized with `dump_chat`. Keyword arguments set the fields that are not
+    serialized, like `renderer`. With `lazy=True` large bodies stay in `data` and are decoded on use.
+    """
+    view = memoryview(data)
+    if bytes(view[: len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a serialized Chat")
+    offset = len(MAGIC)
+    (header_length,) = HEADER_LENGTH.unpack_from(view, offset)
+    offset += HEADER_LENGTH.size
+    header = json.loads(bytes(view[offset : offset + header_length]))
+    blob_start = offset + header_length
+
+    messages = header["messages"]
+    for index, start, length in header["blobs"]:
+        start += blob_start
+        if lazy:
+            content = BlobContent(view, start, length)
+        else:
+            content = str(view[start : start + length], "utf-8")
+        messages[index]["content"] = content
+
+    chat = cls(**header["fields"], **kwargs)
+    if chat.content_store is not None:
+        messages = [chat.content_store.compact(message) for message in messages]
+    chat.messages = messages
+    chat.saved_tools = resolve_tools(header["tools"])
+    return chat
@@ -0,0 +1,206 @@
+import mmap
+import sys
+import tempfile
+import threading
+from collections import OrderedDict, UserString
+from typing import Any, Optional
+
+
+class LazyContent(UserString):
+    """
+    Message content that is materialized only when it is used.
+    Subclasses implement `_load`; derived strings (slices, concatenations) are plain values.
+    """
+
+    def __init__(self, seq: Optional[Any] = None):
+        self._data = None if seq is None else str(seq)
+
+    @property
+    def data(self) -> str:
+        if self._data is not None:
+            return self._data
+        return self._load()
+
+    def _load(self) -> str:
+        raise NotImplementedError
+
+    def __radd__(self, other: Any) -> str:
+        return str(other) + self.data
+
+    def __rmod__(self, template: Any) -> str:
+        return str(template) % self.data
+
+
+def _plain_result(name: str):
+    method = getattr(str, name)
+
+    def derived(self, *args, **kwargs):
+        args = [arg.data if isinstance(arg, UserString) else arg for arg in args]
+        return method(self.data, *args, **kwargs)
+
+    derived.__name__ = name
+    return derived
+
+
+# UserString builds these results with self.__class__, which lazy contents cannot be constructed from
+for _name in (
+    "__getitem__", "__add__", "__mul__", "__rmul__", "__mod__", "capitalize", "casefold", "center",
+    "removeprefix", "removesuffix", "expandtabs", "ljust", "lower", "lstrip", "replace", "rjust",
+    "rstrip", "strip", "swapcase", "title", "translate", "upper", "zfill",
+):
+    setattr(LazyContent, _name, _plain_result(_name))
+
+
+class SpilledContent(LazyContent):
+    """
+    Content kept in the spill file of a ContentStore, read back on every access.
+    """
+
+    def __init__(self, store: "ContentStore", offset: int, length: int, generation: int = 0):
+        super().__init__()
+        self._store = store
+        self._offset = offset
+        self._length = length
+        self._generation = generation  # the spill file the content was written to
+
+    def _load(self) -> str:
+        return self._store.read(self._offset, self._length, self._generation)
+
+
+class ContentStore:
+    """
+    Shared store for message bodies that repeat across many chats.
+
+    System prompts and small tool results (up to `intern_max_size` characters, the ones likely to repeat)
+    are interned so that identical contents are kept once. Larger tool results stay owned by their chat,
+    or are moved to a memory-mapped file when longer than `spill_threshold` characters.
+    One store is meant to be shared by all Chat instances of a process.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10_000,
+        spill_threshold: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        intern_max_size: int = 1024,
+    ):
+        self.max_entries = max_entries
+        self.intern_max_size = intern_max_size
+        self.spill_threshold = spill_threshold
+        self.spill_dir = spill_dir
+        self._strings: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._spill_file = None
+        self._spill_map: Optional[mmap.mmap] = None
+        self._spill_size = 0
+        self._generation = 0  # incremented by close, so handles into a released file fail
+
+    def intern(self, content: str) -> str:
+        """
+        Return the stored copy of `content`, adding it to the store if it is new.
+        """
+        with self._lock:
+            stored = self._strings.get(content)
+            if stored is not None:
+                self._strings.move_to_end(content)
+                return stored
+            self._strings[content] = content
+            if len(self._strings) > self.max_entries:
+                self._strings.popitem(last=False)
+            return content
+
+    def is_shared(self, content: Any) -> bool:
+        """
+        True if `content` is held by the store rather than by a single chat.
+        """
+        if isinstance(content, SpilledContent):
+            return content._store is self
+        if not isinstance(content, str):
+            return False
+        return self._strings.get(content) is content
+
+    def spill(self, content: str) -> SpilledContent:
+        """
+        Write `content` to the spill file and return a handle that reads it back on demand.
+        """
+        encoded = content.encode("utf-8")
+        with self._lock:
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile(dir=self.spill_dir)
+            offset = self._spill_size
+            self._spill_file.seek(offset)
+            self._spill_file.write(encoded)
+            self._spill_file.flush()
+            self._spill_size += len(encoded)
+            generation = self._generation
+        return SpilledContent(self, offset, len(encoded), generation)
+
+    def read(self, offset: int, length: int, generation: int = 0) -> str:
+        with self._lock:
+            if generation != self._generation or self._spill_file is None:
+                raise ValueError("Spilled content is no longer available - its ContentStore was closed")
+            if self._spill_map is None or len(self._spill_map) < offset + length:
+                if self._spill_map is not None:
+                    self._spill_map.close()
+                self._spill_map = mmap.mmap(
+                    self._spill_file.fileno(), self._spill_size, access=mmap.ACCESS_READ
+                )
+            return self._spill_map[offset : offset + length].decode("utf-8")
+
+    def compact(self, message: dict) -> dict:
+        """
+        Return a compact copy of a message dict: keys with None values are dropped
+        and system or small tool contents are interned, large tool contents spilled.
+        """
+        compacted = {
+            key: value
+            for key, value in message.items()
+            if value is not None or key in ("role", "content")
+        }
+        content = compacted.get("content")
+        if type(content) is not str:
+            return compacted
+        role = compacted.get("role")
+        if role == "system":
+            compacted["content"] = self.intern(content)
+        elif role == "tool":
+            if self.spill_threshold is not None and len(content) > self.spill_threshold:
+                compacted["content"] = self.spill(content)
+            elif len(content) <= self.intern_max_size:
+                compacted["content"] = self.intern(content)
+        return compacted
+
+    def close(self) -> None:
+        """
+        Release the spill file. Contents spilled before are no longer readable; the store can be reused.
+        """
+        with self._lock:
+            if self._spill_map is not None:
+                self._spill_map.close()
+                self._spill_map = None
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            self._spill_size = 0
+            self._generation += 1
+
+
+def history_size(messages: list, store: Optional[ContentStore] = None) -> int:
+    """
+    Approximate number of bytes held by a message history alone.
+    Contents shared through `store` are not counted.
+    """
+    seen: set[int] = set()
+
+    def sizeof(obj: Any) -> int:
+        if id(obj) in seen or (store is not None and store.is_shared(obj)):
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            size += sum(sizeof(key) + sizeof(value) for key, value in obj.items())
+        elif isinstance(obj, (list, tuple)):
+            size += sum(sizeof(item) for item in obj)
+        return size
+
+    return sizeof(messages)
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from litellm import ModelResponse
+from pydantic import BaseModel
+
+from prompete import Chat
+from prompete.batch import BatchRunner, LocalBatchBackend
+
+
+class Sentiment(BaseModel):
+    label: str
+    score: float
+
+
+def get_length(text: str) -> int:
+    """Length of the text"""
+    return len(text)
+
+
+def fake_completion(**args):
+    question = args["messages"][-1]["content"]
+    if "response_format" in args:
+        assert args["response_format"]["type"] == "json_schema"
+        message = {"role": "assistant", "content": json.dumps({"label": question, "score": 0.5})}
+    elif "tools" in args:
+        name = args["tools"][0]["function"]["name"]
+        arguments = {"label": question, "score": 0.5} if name == "Sentiment" else {"text": question}
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": "call_1", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+            ],
+        }
+    elif question == "fail":
+        raise RuntimeError("provider error")
+    else:
+        message = {"role": "assistant", "content": question.upper()}
+    return ModelResponse(choices=[{"message": message}], model=args["model"])
+
+
+def test_batch_calls(tmp_path):
+    runner = BatchRunner(LocalBatchBackend(send=fake_completion), directory=str(tmp_path))
+
+    plain_chat = Chat(model="gpt-4o-mini")
+    native_chat = Chat(model="gpt-4o-mini", emulate_response_format=False)
+    emulated_chat = Chat(model="gpt-4o-mini", emulate_response_format=True)
+    tool_chat = Chat(model="gpt-4o-mini")
+    failing_chat = Chat(model="gpt-4o-mini")
+
+    plain = runner.submit(plain_chat, "hello")
+    native = runner.submit(native_chat, "positive", response_format=Sentiment)
+    emulated = runner.submit(emulated_chat, "negative", response_format=Sentiment)
+    tool = runner.submit(tool_chat, "abc", tools=[get_length])
+    failing = runner.submit(failing_chat, "fail")
+    assert len(runner) == 5
+    assert not plain.done()
+
+    futures = runner.flush()
+
+    assert len(futures) == 5
+    assert len(runner) == 0
+    assert plain.result() == "HELLO"
+    assert plain_chat.messages[-1]["content"] == "HELLO"
+    assert native.result() == Sentiment(label="positive", score=0.5)
+    assert emulated.result() == Sentiment(label="negative", score=0.5)
+    assert tool.result() is None
+    assert tool_chat.process() == [3]
+    with pytest.raises(RuntimeError, match="provider error"):
+        failing.result()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_one_pending_call_per_chat():
+    runner = BatchRunner(LocalBatchBackend(send=fake_completion))
+    chat = Chat(model="gpt-4o-mini")
+    runner.submit(chat, "first")
+
+    with pytest.raises(ValueError):
+        runner.submit(chat, "second")
+    assert runner.flush()[0].result() == "FIRST"
+    assert runner.flush() == []
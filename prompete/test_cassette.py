@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from litellm import ModelResponse
+from pydantic import BaseModel
+
+from prompete import Chat
+from prompete.cassette import Cassette, CassetteMiss, request_key
+
+
+def get_current_weather(location: str) -> dict:
+    """Get the current weather in a given location"""
+    return {"location": location, "temperature": 22}
+
+
+def fake_completion(**args):
+    last = args["messages"][-1]
+    if "tools" in args and last["role"] == "user":
+        message = {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": "get_current_weather", "arguments": json.dumps({"location": "London"})},
+                }
+            ],
+        }
+    else:
+        message = {"role": "assistant", "content": f"Reply to: {last['content']}"}
+    return ModelResponse(choices=[{"message": message}], model=args["model"])
+
+
+def run_conversation(chat):
+    chat("What's the weather like in London?", tools=[get_current_weather])
+    outputs = chat.process()
+    answer = chat.llm_reply()
+    return outputs, answer.choices[0].message.content
+
+
+def test_record_and_replay_multi_turn_tool_flow(tmp_path):
+    path = str(tmp_path / "weather.jsonl")
+
+    recorder = Cassette(path, mode="record", send=fake_completion)
+    recorded = run_conversation(Chat(model="gpt-4o-mini", transport=recorder))
+    assert len(recorder) == 2
+
+    def no_network(**args):
+        raise AssertionError("replay must not send requests")
+
+    player = Cassette(path, send=no_network)
+    for _ in range(3):
+        assert run_conversation(Chat(model="gpt-4o-mini", transport=player)) == recorded
+
+    with pytest.raises(CassetteMiss):
+        Chat(model="gpt-4o-mini", transport=player)("Something else")
+
+
+def test_once_mode_records_only_missing_requests(tmp_path):
+    path = str(tmp_path / "once.jsonl")
+    calls = []
+
+    def counting_completion(**args):
+        calls.append(args)
+        return fake_completion(**args)
+
+    for _ in range(2):
+        cassette = Cassette(path, mode="once", send=counting_completion)
+        assert Chat(model="gpt-4o-mini", transport=cassette)("Hello") == "Reply to: Hello"
+
+    assert len(calls) == 1
+
+
+def test_request_key_normalization():
+    class Answer(BaseModel):
+        text: str
+
+    args = {
+        "model": "gpt-4o-mini",
+        "messages": [{"role": "assistant", "content": "Hi", "tool_calls": None}],
+        "response_format": Answer,
+    }
+    same = {
+        "response_format": Answer,
+        "num_retries": 3,
+        "api_key": "sk-secret",
+        "messages": [{"content": "Hi", "role": "assistant"}],
+        "model": "gpt-4o-mini",
+    }
+
+    assert request_key(args) == request_key(same)
+    assert request_key(args) != request_key({**args, "model": "gpt-4o"})
+
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "x.jsonl"), mode="stream")
@@ -1,13 +1,16 @@
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from litellm import Message, TextCompletionResponse, TextChoices
 from typing import Any, Optional
 import json
+import time
 
 from llm_easy_tools import ToolResult
 from jinja2 import Environment, DictLoader, FileSystemLoader, ChoiceLoader
 
 from prompete import Chat, Prompt, SystemPrompt
+from prompete.chat import RenderedPrompt
 
 
 def create_mock_response(
@@ -368,6 +371,63 @@ def test_process_tool_calls(mocker):
     assert chat.messages[-1]["name"] == "get_current_weather"
 
 
+def test_process_renders_prompt_outputs_lazily_and_once(mocker):
+    @dataclass(frozen=True)
+    class ReportPrompt(Prompt):
+        city: str
+
+    renderer = Environment(loader=DictLoader({"ReportPrompt": "Report for {{city}}"}))
+    render_prompt = mocker.spy(Chat, "render_prompt")
+
+    def get_report(city: str) -> ReportPrompt:
+        """Get the weather report for a city"""
+        return ReportPrompt(city=city)
+
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response(
+        content=None,
+        tool_calls=[
+            {
+                "id": "call_123",
+                "type": "function",
+                "function": {"name": "get_report", "arguments": json.dumps({"city": "Paris"})},
+            }
+        ],
+    )
+    chat = Chat(model="gpt-4-0125-preview", renderer=renderer)
+    chat("What's the weather in Paris?", tools=[get_report])
+
+    outputs = chat.process()
+    assert isinstance(outputs[0], RenderedPrompt)
+    assert outputs[0] is chat.messages[-1]["content"]
+    assert outputs[0].prompt == ReportPrompt(city="Paris")
+    render_prompt.assert_not_called()
+
+    mock_completion.return_value = create_mock_response("Sunny")
+    chat.llm_reply()
+    sent = mock_completion.call_args[1]["messages"][-1]
+    assert sent == {"role": "tool", "tool_call_id": "call_123", "name": "get_report", "content": "Report for Paris"}
+    assert type(sent["content"]) is str
+    assert outputs == ["Report for Paris"]
+    assert render_prompt.call_count == 1
+
+
+def test_rendered_prompt_renders_once_across_threads():
+    calls = []
+
+    def render(prompt):
+        calls.append(prompt)
+        time.sleep(0.01)
+        return "rendered"
+
+    content = RenderedPrompt(Prompt(), render)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: str(content), range(8)))
+
+    assert results == ["rendered"] * 8
+    assert len(calls) == 1
+
+
 def test_llm_reply_strict_parameter(mocker):
     # Mock the get_tool_defs function
     mock_get_tool_defs = mocker.patch("prompete.chat.get_tool_defs")
@@ -497,3 +557,102 @@ def test_chat_emulate_response_format(mocker):
     ):
         chat("Hello", response_format=TestResponseFormat, tools=[lambda x: x])
         chat("Hello", response_format=TestResponseFormat, tools=[lambda x: x])
+
+
+def test_emulated_response_format_without_tool_processing(mocker):
+    from pydantic import BaseModel
+
+    class Verdict(BaseModel):
+        accepted: bool
+
+    def verdict_response(arguments):
+        return create_mock_response(
+            content=None,
+            tool_calls=[
+                {
+                    "id": "call_1",
+                    "type": "function",
+                    "function": {"name": "Verdict", "arguments": arguments},
+                }
+            ],
+        )
+
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = verdict_response('{"accepted": true}')
+    process_message = mocker.patch("llm_easy_tools.processor.process_message")
+
+    chat = Chat(model="some_model", emulate_response_format=True)
+    assert chat("Accept?", response_format=Verdict) == Verdict(accepted=True)
+    process_message.assert_not_called()
+    assert chat.messages[-1] == {
+        "role": "tool",
+        "tool_call_id": "call_1",
+        "name": "Verdict",
+        "content": "Verdict created",
+    }
+    schemas = mock_completion.call_args.kwargs["tools"]
+
+    # The synthetic tool result can be left out and the tool schema is reused
+    chat = Chat(model="some_model", emulate_response_format=True, keep_response_format_result=False)
+    assert chat("Accept?", response_format=Verdict) == Verdict(accepted=True)
+    assert [message["role"] for message in chat.messages] == ["user", "assistant"]
+    assert mock_completion.call_args.kwargs["tools"] is schemas
+
+    # Invalid arguments are reported to the LLM when fail_on_tool_error is False
+    mock_completion.return_value = verdict_response('{"accepted": "maybe"}')
+    chat = Chat(model="some_model", emulate_response_format=True, fail_on_tool_error=False)
+    assert chat("Accept?", response_format=Verdict) is None
+    assert "accepted" in chat.messages[-1]["content"]
+
+    chat = Chat(model="some_model", emulate_response_format=True)
+    with pytest.raises(ValueError):
+        chat("Accept?", response_format=Verdict)
+
+
+def test_emulated_response_format_repairs_arguments(mocker):
+    from pydantic import BaseModel
+
+    class Tags(BaseModel):
+        tags: list[str]
+
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response(
+        content=None,
+        tool_calls=[
+            {
+                "id": "call_1",
+                "type": "function",
+                "function": {"name": "Tags", "arguments": '{"tags": "a, b", }'},
+            }
+        ],
+    )
+    chat = Chat(model="some_model", emulate_response_format=True)
+
+    assert chat("Tags?", response_format=Tags) == Tags(tags=["a", "b"])
+    samples = chat.sample("Tags?", n=2, response_format=Tags)
+    assert samples.value == Tags(tags=["a", "b"])
+
+
+def test_emulated_response_format_tools_are_not_shared(mocker):
+    from pydantic import BaseModel
+
+    class Tags(BaseModel):
+        tags: list[str]
+
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response(
+        content=None,
+        tool_calls=[
+            {"id": "call_1", "type": "function", "function": {"name": "Tags", "arguments": '{"tags": ["a"]}'}}
+        ],
+    )
+    first = Chat(model="some_model", emulate_response_format=True)
+    first("Tags?", response_format=Tags)
+    schemas = mock_completion.call_args.kwargs["tools"]
+    first.saved_tools.append(lambda: None)
+
+    second = Chat(model="some_model", emulate_response_format=True)
+    assert second("Tags?", response_format=Tags) == Tags(tags=["a"])
+    assert second.saved_tools == [Tags]
+    assert second.saved_tools is not first.saved_tools
+    assert mock_completion.call_args.kwargs["tools"] is schemas
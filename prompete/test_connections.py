@@ -0,0 +1,91 @@
+import pytest
+from litellm.llms.custom_httpx.http_handler import AsyncHTTPHandler, HTTPHandler
+from openai import OpenAI
+
+from prompete import Chat
+from prompete.connections import ConnectionPool
+from prompete.test_chat import create_mock_response
+
+
+def test_openai_clients_are_reused(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    pool = ConnectionPool(max_connections=7, timeout=30, http2=False)
+
+    client = pool.client_for({"model": "gpt-4o-mini"})
+    assert isinstance(client, OpenAI)
+    assert client.max_retries == 0
+    assert pool.client_for({"model": "gpt-4o-mini"}) is client
+    assert pool.client_for({"model": "gpt-4o", "api_base": "http://localhost:8000/v1"}) is not client
+    pool.close()
+    assert pool._clients == {}
+
+
+def test_no_pooling_without_openai_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    assert ConnectionPool().client_for({"model": "gpt-4o-mini"}) is None
+
+
+def test_http_handler_for_other_providers():
+    pool = ConnectionPool(http2=False)
+    args = {"model": "anthropic/claude-3-haiku-20240307"}
+
+    client = pool.client_for(args)
+    assert isinstance(client, HTTPHandler)
+    assert pool.client_for(args) is client
+    pool.close()
+
+
+@pytest.mark.anyio
+async def test_async_clients():
+    pool = ConnectionPool(http2=False)
+    args = {"model": "anthropic/claude-3-haiku-20240307"}
+
+    client = pool.async_client_for(args)
+    assert isinstance(client, AsyncHTTPHandler)
+    assert pool.async_client_for(args) is client
+    await pool.aclose()
+    assert pool._clients == {}
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def test_chat_passes_pooled_client(mocker, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response("Hi")
+    pool = ConnectionPool(http2=False)
+    build_client = mocker.spy(pool, "_openai_client")
+
+    chat = Chat(model="gpt-4o-mini", connection_pool=pool)
+    chat("Hello")
+    chat("Hello again")
+
+    clients = [call.kwargs["client"] for call in mock_completion.call_args_list]
+    assert isinstance(clients[0], OpenAI)
+    assert clients[0] is clients[1]
+    assert build_client.call_count == 1
+    for message in chat.messages:
+        assert clients[0] not in message.values()
+    pool.close()
+
+
+def test_keyless_self_hosted_server_is_pooled(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    pool = ConnectionPool(http2=False)
+
+    client = pool.client_for({"model": "openai/llama3", "api_base": "http://localhost:8000/v1"})
+    assert isinstance(client, OpenAI)
+    assert client.api_key == "sk-no-key"
+    pool.close()
+
+
+def test_azure_uses_litellm_client(monkeypatch):
+    monkeypatch.setenv("AZURE_API_KEY", "test")
+    pool = ConnectionPool(http2=False)
+    args = {"model": "azure/gpt-4o", "api_base": "https://example.openai.azure.com"}
+
+    assert pool.client_for(args) is None
+    assert pool.async_client_for(args) is None
@@ -0,0 +1,76 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from litellm import Message
+
+from prompete import Chat
+from prompete.executors import make_tool_executor, run_tool_calls
+
+
+def count_words(text: str) -> int:
+    """Count words in the text"""
+    return len(text.split())
+
+
+def failing_tool(text: str) -> str:
+    """Always fails"""
+    raise RuntimeError(f"cannot handle {text}")
+
+
+def tool_call_message(*calls):
+    return Message(
+        role="assistant",
+        content=None,
+        tool_calls=[
+            {
+                "id": f"call_{i}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args)},
+            }
+            for i, (name, args) in enumerate(calls)
+        ],
+    )
+
+
+@pytest.mark.parametrize("kind", ["thread", "process"])
+def test_run_tool_calls(kind):
+    message = tool_call_message(
+        ("count_words", {"text": "one two three"}),
+        ("failing_tool", {"text": "this"}),
+        ("missing_tool", {}),
+    )
+    executor = make_tool_executor(kind, max_workers=2)
+    try:
+        results = run_tool_calls(message, [count_words, failing_tool], executor)
+    finally:
+        executor.shutdown()
+
+    assert [result.tool_call_id for result in results] == ["call_0", "call_1", "call_2"]
+    assert results[0].output == 3
+    assert results[0].error is None
+    assert isinstance(results[1].error, RuntimeError)
+    assert "cannot handle this" in results[1].stack_trace
+    assert "missing_tool not found" in str(results[2].error)
+
+
+def test_inline_executor():
+    assert make_tool_executor("inline") is None
+    with pytest.raises(ValueError):
+        make_tool_executor("gpu")
+
+
+def test_chat_process_with_executor():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        chat = Chat(model="gpt-3.5-turbo", tool_executor=executor, fail_on_tool_error=False)
+        chat.saved_tools = [count_words, failing_tool]
+        chat.append(
+            tool_call_message(
+                ("count_words", {"text": "a b"}), ("failing_tool", {"text": "x"})
+            )
+        )
+        outputs = chat.process()
+
+    assert outputs == [2, None]
+    assert chat.messages[-2]["content"] == "2"
+    assert chat.messages[-1]["content"] == "cannot handle x"
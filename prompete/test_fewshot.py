@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+
+import pytest
+from jinja2 import DictLoader, Environment
+
+pytest.importorskip("numpy")
+
+from prompete import Chat, Prompt  # noqa: E402
+from prompete.embeddings import HashingEmbedder  # noqa: E402
+from prompete.fewshot import ExampleSelector  # noqa: E402
+
+EXAMPLES = [
+    {"question": "How do I reset my password?", "answer": "Use the reset link."},
+    {"question": "How do I change my email address?", "answer": "Go to settings."},
+    {"question": "Where is my order?", "answer": "Check the tracking page."},
+    {"question": "Can I return a damaged order?", "answer": "Yes, within 30 days."},
+    {"question": "What payment methods do you accept?", "answer": "Cards and transfers."},
+]
+
+
+def question(example: dict) -> str:
+    return example["question"]
+
+
+@pytest.mark.parametrize("embedder", [None, HashingEmbedder()])
+def test_selects_most_relevant_examples(embedder):
+    selector = ExampleSelector(EXAMPLES, text=question, embedder=embedder, max_df=1.0)
+
+    selected = selector.select("my order was damaged, can I return it?", k=2)
+
+    assert selected[0] is EXAMPLES[3]
+    assert EXAMPLES[2] in selected
+
+
+@pytest.mark.parametrize("embedder", [None, HashingEmbedder()])
+def test_empty_example_list(embedder):
+    selector = ExampleSelector([], embedder=embedder)
+
+    assert selector.select("anything", k=3, max_tokens=100) == []
+    assert len(selector) == 0
+
+
+def test_token_budget_keeps_most_relevant_prefix():
+    selector = ExampleSelector(EXAMPLES, text=question, tokens=lambda example: 10, max_df=1.0)
+
+    assert len(selector.select("order", k=3)) == 2
+    assert len(selector.select("order", k=3, max_tokens=15)) == 1
+    assert selector.select("order", k=3, max_tokens=5) == []
+
+
+def test_selection_is_cached_per_input():
+    selector = ExampleSelector(EXAMPLES, text=question, max_df=1.0)
+
+    first = selector.indexes("password reset", k=1)
+
+    assert selector.indexes("password reset", k=1) is first
+    assert selector.indexes("password reset", k=2) is not first
+    assert list(first) == [0]
+
+
+def test_common_terms_are_ignored():
+    selector = ExampleSelector(EXAMPLES, text=question, max_df=0.3)
+
+    assert selector.select("how do I", k=2) == []
+
+
+def test_selector_in_template():
+    @dataclass(frozen=True)
+    class SupportPrompt(Prompt):
+        question: str
+
+    templates = {
+        "SupportPrompt": (
+            "{% for example in select_examples(question, k=1) %}"
+            "Q: {{ example.question }}\nA: {{ example.answer }}\n"
+            "{% endfor %}Q: {{ question }}"
+        )
+    }
+    renderer = Environment(loader=DictLoader(templates))
+    renderer.globals["select_examples"] = ExampleSelector(EXAMPLES, text=question, max_df=1.0)
+    chat = Chat(model="gpt-4", renderer=renderer)
+
+    content = chat.render_prompt(SupportPrompt(question="I forgot my password"))
+
+    assert content == "Q: How do I reset my password?\nA: Use the reset link.\nQ: I forgot my password"
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+IMPORT_SCRIPT = """
+import sys
+import time
+
+start = time.perf_counter()
+from prompete import Chat, Prompt
+elapsed = time.perf_counter() - start
+
+chat = Chat(model="gpt-4o-mini", system_prompt="You are a helpful assistant.")
+chat.append("Hello")
+print(elapsed, "litellm" in sys.modules, "llm_easy_tools" in sys.modules)
+"""
+
+
+def test_import_does_not_load_litellm():
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT], capture_output=True, text=True, check=True
+    )
+    elapsed, litellm_loaded, llm_easy_tools_loaded = result.stdout.split()
+
+    assert litellm_loaded == "False"
+    assert llm_easy_tools_loaded == "False"
+    # litellm alone takes seconds to import
+    assert float(elapsed) < 0.5
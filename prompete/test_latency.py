@@ -0,0 +1,177 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+
+import pytest
+
+from prompete import Chat
+from prompete.latency import LatencyPolicy
+from prompete.test_chat import create_mock_response
+
+
+class ServerError(Exception):
+    status_code = 503
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def test_retries_until_success():
+    policy = LatencyPolicy(max_attempts=3, backoff_base=0.001)
+    calls = []
+
+    def send(**args):
+        calls.append(args)
+        if len(calls) < 3:
+            raise ServerError("overloaded")
+        return "ok"
+
+    assert policy.run(send, {"model": "m"}) == "ok"
+    metrics = policy.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["attempts"] == 3
+    assert metrics["failures"] == 0
+    assert metrics["error_rate"] == pytest.approx(2 / 3)
+
+
+@pytest.mark.parametrize("error", [BadRequest("invalid"), TypeError("bad argument"), ValueError("bad value")])
+def test_no_retry_for_permanent_errors(error):
+    policy = LatencyPolicy(max_attempts=3, backoff_base=0.001)
+
+    def send(**args):
+        raise error
+
+    with pytest.raises(type(error)):
+        policy.run(send, {})
+    assert policy.metrics()["attempts"] == 1
+    assert policy.metrics()["failures"] == 1
+
+
+def test_retries_connection_errors():
+    policy = LatencyPolicy(max_attempts=2, backoff_base=0.001)
+    errors = [ConnectionResetError("reset")]
+
+    def send(**args):
+        if errors:
+            raise errors.pop()
+        return "ok"
+
+    assert policy.run(send, {}) == "ok"
+    assert policy.metrics()["retries"] == 1
+
+
+def test_budget_limits_retries():
+    policy = LatencyPolicy(max_attempts=5, backoff_base=0.001, budget_ratio=0, budget_burst=2)
+
+    def send(**args):
+        raise ServerError("down")
+
+    for _ in range(3):
+        with pytest.raises(ServerError):
+            policy.run(send, {})
+    metrics = policy.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["budget_denied"] == 3
+
+
+def test_backoff_grows_with_error_rate():
+    policy = LatencyPolicy(backoff_base=1.0, backoff_max=100)
+    calm = max(policy.backoff(2) for _ in range(20))
+    policy._outcomes.extend([True] * 10)
+    stormy = min(policy.backoff(2) for _ in range(20))
+
+    assert calm <= 2.0
+    assert stormy >= 5.0
+
+
+def test_attempt_timeout_is_passed():
+    policy = LatencyPolicy(attempt_timeout=2.5)
+    assert policy.run(lambda **args: args, {"model": "m"}) == {"model": "m", "timeout": 2.5}
+
+
+def test_hedged_request_wins_over_slow_primary():
+    policy = LatencyPolicy(hedge=True, hedge_min_samples=5)
+    for _ in range(5):
+        policy.run(lambda **args: "warm-up", {})
+
+    release = threading.Event()
+    calls = []
+
+    def send(**args):
+        calls.append(args)
+        if len(calls) == 1:
+            release.wait(5)
+            return "slow"
+        return "fast"
+
+    start = time.monotonic()
+    assert policy.run(send, {}) == "fast"
+    assert time.monotonic() - start < 1
+    release.set()
+    metrics = policy.metrics()
+    assert metrics["hedges"] == 1
+    assert metrics["hedge_wins"] == 1
+    assert metrics["hedge_rate"] == pytest.approx(1 / 6)
+    policy.shutdown()
+
+
+def test_shared_hedging_policy_does_not_limit_concurrency():
+    policy = LatencyPolicy(hedge=True, hedge_min_samples=5, budget_ratio=0, budget_burst=0)
+    for _ in range(5):
+        policy.run(lambda **args: time.sleep(0.05), {})
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def send(**args):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.05)
+        with lock:
+            in_flight -= 1
+        return "ok"
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=100) as executor:
+        results = list(executor.map(lambda _: policy.run(send, {}), range(100)))
+
+    assert results == ["ok"] * 100
+    assert peak > 50
+    assert time.monotonic() - start < 0.5
+    policy.shutdown()
+
+
+def test_hedges_in_flight_are_limited():
+    policy = LatencyPolicy(hedge=True, hedge_min_samples=5, max_hedges=1, budget_burst=100)
+    for _ in range(5):
+        policy.run(lambda **args: None, {})
+    release = threading.Event()
+
+    def send(**args):
+        release.wait(5)
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(policy.run, send, {}) for _ in range(3)]
+        time.sleep(0.3)
+        release.set()
+        assert [future.result() for future in futures] == ["ok"] * 3
+
+    assert policy.metrics()["hedges"] == 1
+    policy.shutdown()
+
+
+def test_chat_uses_latency_policy(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.side_effect = [ServerError("busy"), create_mock_response("Hi")]
+    policy = LatencyPolicy(backoff_base=0.001, attempt_timeout=30)
+    chat = Chat(model="gpt-4o-mini", latency_policy=policy)
+
+    assert chat("Hello") == "Hi"
+    assert mock_completion.call_count == 2
+    assert mock_completion.call_args.kwargs["num_retries"] == 0
+    assert mock_completion.call_args.kwargs["timeout"] == 30
+    assert len(chat.messages) == 2
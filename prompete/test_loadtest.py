@@ -0,0 +1,32 @@
+from prompete.loadtest import LoadTestConfig, main, run_load_test
+
+
+def test_load_test_reports_latency_and_memory():
+    config = LoadTestConfig(
+        sessions=10, concurrency=5, turns=2, latency=0.001, sample_interval=0.05, trace_allocations=True, seed=1
+    )
+    report = run_load_test(config)
+
+    assert report.turns == 20
+    assert report.errors == 0
+    assert report.throughput > 0
+    assert 0 < report.percentile(50) <= report.percentile(99)
+    assert report.peak_rss > 0
+    assert len(report.rss_samples) >= 2
+    assert report.allocation_hotspots
+
+
+def test_load_test_counts_injected_errors():
+    config = LoadTestConfig(sessions=10, concurrency=5, turns=2, latency=0.0, error_rate=1.0, share_content=True)
+    report = run_load_test(config)
+
+    assert report.turns == 0
+    assert report.errors == 20
+    assert report.percentile(99) == 0.0
+
+
+def test_cli(capsys):
+    report = main(["--sessions", "4", "--concurrency", "2", "--turns", "1", "--latency", "0", "--no-tools"])
+
+    assert report.turns == 4
+    assert "throughput" in capsys.readouterr().out
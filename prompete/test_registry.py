@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+from prompete import Chat, Prompt, SystemPrompt
+from prompete.registry import Registry, ToolSet, get_tool
+from prompete.test_chat import create_mock_response
+
+
+@dataclass(frozen=True)
+class SupportSystemPrompt(SystemPrompt):
+    product: str
+
+
+@dataclass(frozen=True)
+class PersonaPrompt(Prompt):
+    name: str
+
+
+def check_order(order_id: str) -> str:
+    """Check the status of an order"""
+    return f"Order {order_id} shipped"
+
+
+def make_registry():
+    registry = Registry()
+    registry.template(SupportSystemPrompt, "You support customers of {{ product }}.")
+    registry.template(PersonaPrompt, "You are {{ name }}.")
+    registry.prompt("support", SupportSystemPrompt(product="Prompete"))
+    registry.prompt("plain", "You are terse.")
+    registry.prompt("persona", PersonaPrompt(name="Ada"))
+    registry.tools("orders", [check_order])
+    registry.model("fast", "gpt-4o-mini", retries=1)
+    registry.model("emulated", "some_model", emulate_response_format=True)
+    return registry
+
+
+def test_warm_up_and_chat(mocker):
+    registry = make_registry()
+    registry.warm_up()
+    render = mocker.spy(Chat, "render_prompt")
+    tool_defs = mocker.patch("prompete.chat.get_tool_defs")
+
+    chat = registry.chat("fast", prompt="support")
+    other = registry.chat("fast", prompt="support")
+
+    render.assert_not_called()
+    assert chat.messages == [{"role": "system", "content": "You support customers of Prompete."}]
+    assert chat.messages[0] is not other.messages[0]
+    assert chat.messages[0]["content"] is other.messages[0]["content"]
+    assert chat.system_prompt == SupportSystemPrompt(product="Prompete")
+    assert chat.retries == 1
+    assert chat.emulate_response_format is False
+    assert registry.chat("emulated").emulate_response_format is True
+    assert registry.chat("fast", prompt="plain").messages[0]["role"] == "system"
+    persona = registry.chat("fast", prompt="persona")
+    direct = Chat(model="gpt-4o-mini", renderer=registry.renderer, system_prompt=PersonaPrompt(name="Ada"))
+    assert persona.messages == direct.messages == [{"role": "system", "content": "You are Ada."}]
+
+    tools = registry.get_tools("orders")
+    assert tools.tool_defs()[0]["function"]["name"] == "check_order"
+    tool_defs.assert_not_called()
+    assert get_tool("check_order") is check_order
+
+
+def test_chat_uses_cached_tool_schemas(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response("Fine")
+    tools = ToolSet([check_order])
+    chat = Chat(model="gpt-4o-mini")
+
+    chat("Where is my order?", tools=tools)
+    schemas = mock_completion.call_args.kwargs["tools"]
+    chat("And now?", tools=tools)
+
+    assert mock_completion.call_args.kwargs["tools"] is schemas
+    assert chat.saved_tools is tools
+
+
+def test_tool_set_schemas_follow_changes():
+    def check_refund(order_id: str) -> str:
+        """Check the status of a refund"""
+        return f"Refund for {order_id} sent"
+
+    tools = ToolSet([check_order])
+    assert [tool["function"]["name"] for tool in tools.tool_defs()] == ["check_order"]
+
+    tools.append(check_refund)
+    assert [tool["function"]["name"] for tool in tools.tool_defs()] == ["check_order", "check_refund"]
+    tools += [check_order]
+    assert len(tools.tool_defs()) == 3
+    del tools[1:]
+    assert [tool["function"]["name"] for tool in tools.tool_defs()] == ["check_order"]
@@ -0,0 +1,83 @@
+import gc
+import weakref
+from dataclasses import dataclass
+
+from jinja2 import DictLoader, Environment
+
+from prompete import Chat, Prompt
+from prompete.chat import public_names
+from prompete.rendering import CachedExtension, FragmentCache
+
+
+@dataclass(frozen=True)
+class InstructionsPrompt(Prompt):
+    language: str
+    question: str
+    rules: tuple = ("be concise", "cite sources")
+
+
+TEMPLATE = """{% cached %}Rules:{% for rule in rules %}
+- {{ rule | upper }}{% endfor %}{% endcached %}
+{% cached language %}Answer in {{ language }}.{% endcached %}
+Question: {{ question }}"""
+
+
+def make_chat():
+    renderer = Environment(loader=DictLoader({"InstructionsPrompt": TEMPLATE}), extensions=[CachedExtension])
+    return Chat(model="gpt-4o-mini", renderer=renderer)
+
+
+def test_cached_blocks_are_rendered_once():
+    chat = make_chat()
+    cache = chat.renderer.fragment_cache
+
+    first = chat.render_prompt(InstructionsPrompt(language="English", question="Why?"))
+    assert first == "Rules:\n- BE CONCISE\n- CITE SOURCES\nAnswer in English.\nQuestion: Why?"
+    assert (cache.hits, cache.misses) == (0, 2)
+
+    second = chat.render_prompt(InstructionsPrompt(language="English", question="How?"))
+    assert second.endswith("Answer in English.\nQuestion: How?")
+    assert (cache.hits, cache.misses) == (2, 2)
+
+    # the unkeyed block is reused even though rules changed - keyed blocks follow their keys
+    third = chat.render_prompt(InstructionsPrompt(language="Polish", question="Who?", rules=("x",)))
+    assert third == "Rules:\n- BE CONCISE\n- CITE SOURCES\nAnswer in Polish.\nQuestion: Who?"
+    assert (cache.hits, cache.misses) == (3, 3)
+
+
+def test_blocks_of_different_templates_do_not_collide():
+    renderer = Environment(extensions=[CachedExtension])
+    first = renderer.from_string("{% cached %}first{% endcached %}")
+    second = renderer.from_string("{% cached %}second{% endcached %}")
+
+    assert first.render() == "first"
+    assert second.render() == "second"
+
+
+def test_fragment_cache_eviction():
+    cache = FragmentCache(maxsize=2)
+    for key in "abc":
+        cache.get_or_render(key, lambda key=key: key)
+
+    assert len(cache) == 2
+    assert cache.get_or_render("a", lambda: "new a") == "new a"
+
+
+def test_public_names_match_dir():
+    prompt = InstructionsPrompt(language="English", question="Why?")
+    expected = [name for name in dir(prompt) if not name.startswith("_")]
+
+    assert sorted(public_names(prompt)) == expected
+
+
+def test_public_names_do_not_keep_classes_alive():
+    @dataclass(frozen=True)
+    class TemporaryPrompt(Prompt):
+        value: str
+
+    assert "value" in public_names(TemporaryPrompt(value="x"))
+    reference = weakref.ref(TemporaryPrompt)
+    del TemporaryPrompt
+    gc.collect()
+
+    assert reference() is None
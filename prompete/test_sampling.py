@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from litellm import ModelResponse
+from pydantic import BaseModel
+
+from prompete import Chat
+from prompete.sampling import majority_vote, select
+
+
+class Answer(BaseModel):
+    value: int
+
+
+def answers_response(contents, tool_calls=False):
+    choices = []
+    for i, content in enumerate(contents):
+        if tool_calls:
+            message = {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [
+                    {"id": f"call_{i}", "type": "function", "function": {"name": "Answer", "arguments": content}}
+                ],
+            }
+        else:
+            message = {"role": "assistant", "content": content}
+        choices.append({"index": i, "message": message})
+    return ModelResponse(choices=choices)
+
+
+def test_sample_with_n(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = answers_response(["4", "5", "4"])
+    chat = Chat(model="gpt-4o-mini")
+
+    samples = chat.sample("2 + 2?", n=3)
+
+    mock_completion.assert_called_once()
+    assert mock_completion.call_args.kwargs["n"] == 3
+    assert samples.results == ["4", "5", "4"]
+    assert samples.value == "4"
+    assert len(chat.messages) == 2
+    assert chat.messages[-1]["content"] == "4"
+
+
+def test_sample_falls_back_to_concurrent_calls(mocker):
+    replies = iter(['{"value": 1}', '{"value": 2}', '{"value": 2}'])
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.side_effect = lambda **args: answers_response([next(replies)])
+    chat = Chat(model="anthropic/claude-3-haiku-20240307", emulate_response_format=False)
+
+    samples = chat.sample("Pick a number", n=3, response_format=Answer)
+
+    assert mock_completion.call_count == 3
+    assert "n" not in mock_completion.call_args.kwargs
+    assert sorted(answer.value for answer in samples.results) == [1, 2, 2]
+    assert samples.value == Answer(value=2)
+    assert json.loads(chat.messages[-1]["content"]) == {"value": 2}
+
+
+def test_sample_emulated_response_format(mocker):
+    mocker.patch("prompete.chat.completion").return_value = answers_response(
+        ['{"value": 7}', '{"wrong": 1}', '{"value": 8}'], tool_calls=True
+    )
+    chat = Chat(model="gpt-4o-mini", emulate_response_format=True)
+
+    samples = chat.sample("Pick a number", n=3, response_format=Answer, aggregate=lambda results: len(results) - 1)
+
+    assert isinstance(samples.results[1], ValueError)
+    assert samples.valid == [Answer(value=7), Answer(value=8)]
+    assert samples.value == Answer(value=8)
+    assert [message["role"] for message in chat.messages] == ["user", "assistant", "tool"]
+    assert chat.messages[1]["tool_calls"][0]["id"] == "call_2"
+
+
+def test_select_raises_when_nothing_is_valid():
+    with pytest.raises(ValueError):
+        select([ValueError("bad"), ValueError("worse")])
+    assert majority_vote(["a", "b", "b"]) == 1
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from prompete import Chat
+from prompete.scheduler import Priority, RequestScheduler
+from prompete.test_chat import create_mock_response
+
+
+def test_limits_requests_in_flight():
+    scheduler = RequestScheduler(max_in_flight=2)
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def request():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return "done"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(scheduler.run("local", request)))
+        for _ in range(6)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["done"] * 6
+    assert peak == 2
+    stats = scheduler.stats()["local"]
+    assert stats["completed"] == 6
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert stats["max_wait"] > 0
+
+
+def test_interactive_requests_go_first():
+    scheduler = RequestScheduler(max_in_flight=1)
+    release = threading.Event()
+    order = []
+
+    blocker = threading.Thread(target=lambda: scheduler.run("local", release.wait))
+    blocker.start()
+    while scheduler.stats()["local"]["in_flight"] == 0:
+        time.sleep(0.001)
+
+    threads = []
+    for name, priority in [("batch", Priority.BATCH), ("interactive", Priority.INTERACTIVE)]:
+        thread = threading.Thread(
+            target=lambda name=name, priority=priority: scheduler.run(
+                "local", lambda: order.append(name), priority=priority
+            )
+        )
+        thread.start()
+        threads.append(thread)
+        while scheduler.stats()["local"]["queue_depth"] < len(threads):
+            time.sleep(0.001)
+
+    release.set()
+    for thread in [blocker] + threads:
+        thread.join()
+
+    assert order == ["interactive", "batch"]
+
+
+def test_backend_limits():
+    scheduler = RequestScheduler(max_in_flight=4, backend_limits={"ollama": 1})
+    scheduler.run("ollama", lambda: None)
+    assert scheduler._backends["ollama"].max_in_flight == 1
+
+
+def test_chat_uses_scheduler(mocker):
+    mocker.patch("prompete.chat.completion").return_value = create_mock_response("Hi")
+    scheduler = RequestScheduler()
+    chat = Chat(
+        model="llama3",
+        custom_llm_provider="openai",
+        scheduler=scheduler,
+        priority=Priority.BATCH,
+    )
+
+    assert chat("Hello") == "Hi"
+    assert scheduler.stats()["openai"]["completed"] == 1
@@ -0,0 +1,120 @@
+import pytest
+from pydantic import BaseModel
+
+pytest.importorskip("numpy")
+
+from prompete import Chat  # noqa: E402
+from prompete.embeddings import HashingEmbedder  # noqa: E402
+from prompete.semantic_cache import SemanticCache  # noqa: E402
+from prompete.test_chat import create_mock_response  # noqa: E402
+
+
+class Answer(BaseModel):
+    value: int
+
+
+def test_hashing_embedder_is_deterministic_and_similarity_preserving():
+    embedder = HashingEmbedder()
+    vectors = embedder(["How do I reset my password?", "how do I reset my password", "What is the weather?"])
+
+    assert (embedder(["How do I reset my password?"])[0] == vectors[0]).all()
+    assert vectors[0] @ vectors[1] > 0.99
+    assert vectors[0] @ vectors[2] < 0.5
+
+
+def test_chat_reuses_answers_to_similar_questions(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response("Use the reset link.")
+    cache = SemanticCache(threshold=0.9)
+
+    first = Chat(model="gpt-4", system_prompt="You are support.", semantic_cache=cache)
+    assert first("How do I reset my password?") == "Use the reset link."
+    second = Chat(model="gpt-4", system_prompt="You are support.", semantic_cache=cache)
+    assert second("how do I reset my password") == "Use the reset link."
+
+    assert mock_completion.call_count == 1
+    assert second.messages[-1] == {"role": "assistant", "content": "Use the reset link."}
+    assert cache.metrics()["hit_rate"] == 0.5
+
+
+def test_cache_is_scoped_by_system_prompt_and_model(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response("answer")
+    cache = SemanticCache()
+
+    Chat(model="gpt-4", system_prompt="You are support.", semantic_cache=cache)("Hello")
+    Chat(model="gpt-4", system_prompt="You are a pirate.", semantic_cache=cache)("Hello")
+    Chat(model="gpt-3.5-turbo", system_prompt="You are support.", semantic_cache=cache)("Hello")
+    Chat(model="gpt-4", system_prompt="You are support.", semantic_cache=cache)("Hello")
+
+    assert mock_completion.call_count == 3
+    assert cache.metrics()["scopes"] == 3
+
+
+def test_follow_up_questions_are_not_cached(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    cache = SemanticCache()
+
+    france = Chat(model="gpt-4", semantic_cache=cache)
+    mock_completion.return_value = create_mock_response("Paris")
+    france("Capital of France?")
+    mock_completion.return_value = create_mock_response("About 68 million")
+    france("What is its population?")
+
+    germany = Chat(model="gpt-4", semantic_cache=cache)
+    mock_completion.return_value = create_mock_response("Berlin")
+    assert germany("Capital of Germany?") == "Berlin"
+    mock_completion.return_value = create_mock_response("About 84 million")
+    assert germany("What is its population?") == "About 84 million"
+
+    assert mock_completion.call_count == 4
+    assert len(cache) == 2
+
+
+def test_cached_response_format_objects_are_validated(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response({"value": 42})
+    cache = SemanticCache()
+
+    def chat():
+        return Chat(model="gpt-4", emulate_response_format=False, semantic_cache=cache)
+
+    assert chat()("The answer?", response_format=Answer) == Answer(value=42)
+    assert chat()("The answer?") == '{"value": 42}'  # a plain answer is cached separately
+    assert chat()("The answer?", response_format=Answer) == Answer(value=42)
+
+    assert mock_completion.call_count == 2
+
+
+def test_calls_with_tools_are_not_cached(mocker):
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response("done")
+    cache = SemanticCache()
+
+    def lookup(query: str) -> str:
+        """Look up"""
+        return query
+
+    chat = Chat(model="gpt-4", semantic_cache=cache)
+    chat("Find it", tools=[lookup])
+    chat("Find it", tools=[lookup])
+
+    assert mock_completion.call_count == 2
+    assert len(cache) == 0
+
+
+def test_least_recently_used_answers_are_evicted():
+    cache = SemanticCache(max_entries=2)
+    messages = [{"role": "system", "content": "s"}]
+    keys = [cache.key("m", [*messages, {"role": "user", "content": text}]) for text in ("one", "two", "three")]
+
+    cache.put(keys[0], "1")
+    cache.put(keys[1], "2")
+    assert cache.get(keys[0]) == "1"
+    cache.put(keys[2], "3")
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) == "1"
+    assert cache.get(keys[2]) == "3"
+    assert cache.metrics()["evictions"] == 1
+    assert len(cache) == 2
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+from jinja2 import DictLoader, Environment
+from litellm import Message
+from pydantic import BaseModel
+
+from prompete import Chat, ContentStore
+from prompete.registry import get_tool, register_tool, tool_name
+from prompete.serialization import BlobContent
+from prompete.test_chat import create_mock_response
+
+
+@register_tool
+def lookup(term: str) -> str:
+    """Look up a term"""
+    return term
+
+
+@register_tool(name="Summary")
+class SummaryFormat(BaseModel):
+    text: str
+
+
+def make_chat():
+    renderer = Environment(loader=DictLoader({}))
+    chat = Chat(
+        model="gpt-4o-mini",
+        renderer=renderer,
+        system_prompt="You are a helpful assistant.",
+        retries=5,
+        emulate_response_format=True,
+    )
+    chat.append("Find 'zebra'")
+    chat.append(
+        Message(
+            role="assistant",
+            content=None,
+            tool_calls=[{"id": "c1", "type": "function", "function": {"name": "lookup", "arguments": '{"term": "zebra"}'}}],
+        )
+    )
+    chat.append({"role": "tool", "tool_call_id": "c1", "name": "lookup", "content": "zebra " * 1000})
+    chat.saved_tools = [lookup, SummaryFormat]
+    return chat
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_round_trip(lazy):
+    chat = make_chat()
+    renderer = Environment(loader=DictLoader({}))
+
+    data = chat.to_bytes()
+    copy = Chat.from_bytes(data, lazy=lazy, renderer=renderer)
+
+    assert copy.renderer is renderer
+    assert copy.model == chat.model
+    assert copy.retries == 5
+    assert copy.emulate_response_format is True
+    assert copy.saved_tools == [lookup, SummaryFormat]
+    assert len(copy.messages) == 4
+    assert isinstance(copy.messages[-1]["content"], BlobContent) == lazy
+    assert copy.llm_messages() == chat.llm_messages()
+    assert len(data) < len(json.dumps(chat.llm_messages())) + 500
+
+
+def test_lazy_content_is_decoded_once():
+    copy = Chat.from_bytes(make_chat().to_bytes(), lazy=True)
+    content = copy.messages[-1]["content"]
+
+    first = copy.llm_messages()[-1]["content"]
+
+    assert content._buffer is None
+    assert copy.llm_messages()[-1]["content"] is first
+
+
+def test_content_store_compacts_loaded_messages():
+    store = ContentStore()
+    chat = Chat(model="gpt-4o-mini", system_prompt="Shared prompt " * 10)
+
+    copy = Chat.from_bytes(chat.to_bytes(), content_store=store)
+
+    assert store.is_shared(copy.messages[0]["content"])
+
+
+def test_unregistered_tools_are_rejected():
+    def local_tool():
+        pass
+
+    chat = Chat(model="gpt-4o-mini")
+    chat.saved_tools = [local_tool]
+
+    with pytest.raises(ValueError, match="not registered"):
+        chat.to_bytes()
+    with pytest.raises(ValueError):
+        Chat.from_bytes(b"garbage")
+
+
+def test_round_trip_after_emulated_response_format(mocker):
+    class Answer(BaseModel):
+        value: int
+
+    mock_completion = mocker.patch("prompete.chat.completion")
+    mock_completion.return_value = create_mock_response(
+        None,
+        tool_calls=[{"id": "c1", "type": "function", "function": {"name": "Answer", "arguments": '{"value": 1}'}}],
+    )
+    chat = Chat(model="some_model", emulate_response_format=True)
+    assert chat("x", response_format=Answer) == Answer(value=1)
+
+    copy = Chat.from_bytes(chat.to_bytes())
+
+    assert copy.saved_tools == []
+    assert copy.llm_messages() == chat.llm_messages()
+
+
+def test_registry():
+    assert get_tool("Summary") is SummaryFormat
+    assert tool_name(lookup) == "lookup"
+    register_tool(lookup)  # registering again is fine
+
+    def lookup_copy(term: str) -> str:
+        return term
+
+    with pytest.raises(ValueError, match="already registered"):
+        register_tool(lookup_copy, name="lookup")
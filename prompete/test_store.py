@@ -0,0 +1,103 @@
+import pytest
+from llm_easy_tools import ToolResult
+
+from prompete import Chat, ContentStore
+from prompete.store import SpilledContent
+
+
+SYSTEM_PROMPT = "You are a helpful assistant. " * 100
+
+
+def test_system_prompt_is_shared_between_chats():
+    store = ContentStore()
+    chat1 = Chat(model="gpt-3.5-turbo", system_prompt=SYSTEM_PROMPT[:], content_store=store)
+    chat2 = Chat(model="gpt-3.5-turbo", system_prompt="".join(SYSTEM_PROMPT), content_store=store)
+
+    assert chat1.messages[0]["content"] is chat2.messages[0]["content"]
+    assert store.is_shared(chat1.messages[0]["content"])
+
+
+def test_memory_usage_does_not_count_shared_contents():
+    store = ContentStore()
+    shared_chat = Chat(model="gpt-3.5-turbo", system_prompt=SYSTEM_PROMPT, content_store=store)
+    private_chat = Chat(model="gpt-3.5-turbo", system_prompt=SYSTEM_PROMPT)
+
+    assert shared_chat.memory_usage() < private_chat.memory_usage() - len(SYSTEM_PROMPT)
+
+
+def test_compact_drops_none_values():
+    store = ContentStore()
+    chat = Chat(model="gpt-3.5-turbo", content_store=store)
+    chat.append({"role": "assistant", "content": None, "tool_calls": None, "function_call": None})
+
+    assert chat.messages[0] == {"role": "assistant", "content": None}
+
+
+def test_large_tool_result_is_spilled():
+    store = ContentStore(spill_threshold=100)
+    chat = Chat(model="gpt-3.5-turbo", content_store=store)
+    big_output = "x" * 1000
+
+    chat.append(ToolResult(tool_call_id="1", name="big", output=big_output).to_message())
+    chat.append(ToolResult(tool_call_id="2", name="small", output="ok").to_message())
+    chat.append(ToolResult(tool_call_id="3", name="big", output="żółw" * 300).to_message())
+
+    assert isinstance(chat.messages[0]["content"], SpilledContent)
+    assert chat.messages[0]["content"] == big_output
+    assert chat.messages[1]["content"] == "ok"
+    assert chat.messages[2]["content"] == "żółw" * 300
+
+    llm_messages = chat.llm_messages()
+    assert type(llm_messages[0]["content"]) is str
+    assert llm_messages[0]["content"] == big_output
+    assert llm_messages[2]["content"] == "żółw" * 300
+    store.close()
+
+
+def test_intern_evicts_oldest_entries():
+    store = ContentStore(max_entries=2)
+    first = store.intern("a" * 10)
+    store.intern("b" * 10)
+    store.intern("c" * 10)
+
+    assert not store.is_shared(first)
+    assert store.intern("c" * 10) == "c" * 10
+
+
+def test_lazy_content_string_methods_return_plain_strings():
+    store = ContentStore(spill_threshold=1)
+    content = store.spill("Hello world")
+
+    assert content[:5] == "Hello" and type(content[:5]) is str
+    assert type(content.upper()) is str
+    assert content + "!" == "Hello world!"
+    assert ">" + content == ">Hello world"
+    assert content.replace(content[:5], "Bye") == "Bye world"
+    store.close()
+
+
+def test_spilled_content_is_unreadable_after_close():
+    store = ContentStore(spill_threshold=1)
+    first = store.spill("first-content")
+    store.close()
+
+    with pytest.raises(ValueError, match="closed"):
+        str(first)
+    second = store.spill("XXXXXXXXXXXXX")
+    with pytest.raises(ValueError, match="closed"):
+        str(first)
+    assert second == "XXXXXXXXXXXXX"
+    store.close()
+
+
+def test_large_unique_tool_results_stay_with_their_chat():
+    store = ContentStore(intern_max_size=100)
+    chat = Chat(model="gpt-3.5-turbo", content_store=store)
+
+    chat.append(ToolResult(tool_call_id="1", name="small", output="ok").to_message())
+    chat.append(ToolResult(tool_call_id="2", name="big", output="y" * 1000).to_message())
+
+    assert store.is_shared(chat.messages[0]["content"])
+    assert not store.is_shared(chat.messages[1]["content"])
+    assert len(store._strings) == 1
+    assert chat.memory_usage() > 1000